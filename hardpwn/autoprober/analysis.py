@@ -1,3 +1,4 @@
+import hashlib
 from typing import List, Optional
 
 COMMON_BAUDS = [115200, 57600, 38400, 19200, 9600]
@@ -21,3 +22,22 @@ def estimate_baud_from_edges(edges: List[float]) -> Optional[int]:
 
 def confidence_from_count(n:int, max_n:int=4)->float:
     return min(0.95, 0.4 + 0.15 * min(n, max_n))
+
+def fingerprint_findings(findings) -> Optional[str]:
+    """
+    Stable target fingerprint from what the findings identify: JEDEC IDs, JTAG IDCODEs,
+    I2C address sets and UART pin/baud. Returns None when there is nothing to key on.
+    """
+    parts = []
+    for f in findings:
+        if f.kind == 'spi':
+            parts.append(f"spi:{f.meta.get('jedec')}")
+        elif f.kind == 'jtag':
+            parts.append(f"jtag:{f.meta.get('idcode')}")
+        elif f.kind == 'i2c':
+            parts.append("i2c:" + ",".join(sorted(f.meta.get('addresses', []))))
+        elif f.kind == 'uart':
+            parts.append(f"uart:{sorted(f.pins.items())}@{f.meta.get('baud')}")
+    if not parts:
+        return None
+    return "id:" + hashlib.sha1("|".join(sorted(parts)).encode()).hexdigest()[:16]
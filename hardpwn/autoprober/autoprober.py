@@ -1,9 +1,14 @@
 import traceback
-from .types import ProbeReport, Finding
-from .analysis import estimate_baud_from_edges, confidence_from_count
+from contextlib import closing
+from dataclasses import asdict
+from itertools import permutations
+from .types import ProbeReport, Finding, Progress
+from .analysis import estimate_baud_from_edges, confidence_from_count, fingerprint_findings
+
+UART_BAUDS = [115200, 57600, 38400, 19200, 9600]
 
 class AutoProber:
-    def __init__(self, transport):
+    def __init__(self, transport, db=None, max_spi_tries=400, max_jtag_tries=800):
         """
         transport: object implementing methods:
           - list_pins()
@@ -12,11 +17,63 @@ class AutoProber:
           - i2c_scan(sda,scl)
           - spi_xfer(sclk,mosi,miso,cs,data)
           - jtag_try_idcode((tck,tms,tdi,tdo))
+        and optionally on-device scanners that replace the host-side permutation loops; they
+        yield firmware messages ({'hit': {...}} / {'progress': i, 'total': n}) and stop the
+        device scan when closed:
+          - uart_scan(pins), spi_scan(pins), jtag_scan(pins)
+          - close(): called when a probe ends (e.g. to restore pin functions); the transport
+            must stay usable afterwards
+        db: optional HardpwnDB; findings are logged and pinouts cached there
+        max_spi_tries/max_jtag_tries bound the host-side permutation searches.
         """
         self.t = transport
+        self.db = db
+        self.max_spi_tries = max_spi_tries
+        self.max_jtag_tries = max_jtag_tries
+
+    def run_probe(self, target_id=None, use_cache=True, exhaustive=False):
+        """
+        target_id is an optional user label for the board. With a DB attached, pinouts cached
+        for that label (or, unlabeled, the most recent ones) are re-verified first and the full
+        search only runs when none of them still matches. Unlabeled reuse needs a matching chip
+        identity (JEDEC ID, IDCODE or I2C addresses); console bytes on a UART alone don't count.
+        """
+        report = ProbeReport(target_id=target_id or "target")
+        for _ in self.iter_probe(target_id, use_cache, exhaustive, report=report):
+            pass
+        return report
+
+    def iter_probe(self, target_id=None, use_cache=True, exhaustive=False, cancel=None, report=None):
+        """
+        Streaming form of run_probe. Yields each Finding as soon as it is confirmed (already
+        logged to the DB) with Progress events in between.
+          exhaustive: keep searching after the first hit of each protocol
+          cancel:     object with is_set() (e.g. threading.Event), checked between candidates;
+                      closing the generator cancels as well
+          report:     optional ProbeReport that collects findings and log lines as they come
+        The pinout cache is only updated when the sweep runs to completion.
+        """
+        report = report if report is not None else ProbeReport(target_id=target_id or "target")
+        try:
+            yield from self._iter_probe(target_id, use_cache, exhaustive, cancel, report)
+        finally:
+            if hasattr(self.t, 'close'):
+                try:
+                    self.t.close()
+                except Exception as e:
+                    report.log(f"Failed to release transport: {e}")
 
-    def run_probe(self, target_id="target"):
-        report = ProbeReport(target_id=target_id)
+    def _iter_probe(self, target_id, use_cache, exhaustive, cancel, report):
+        stop = (lambda: cancel.is_set()) if cancel is not None else (lambda: False)
+        if use_cache and self.db:
+            cached = self._probe_cached(target_id, report)
+            if cached:
+                for f in cached:
+                    report.add_finding(f)
+                    self._log_finding(f)
+                    yield f
+                self._record(report, target_id)
+                return
         try:
             pins = self.t.list_pins()
             report.log(f"Scanning {len(pins)} pins")
@@ -24,122 +81,238 @@ class AutoProber:
             report.log(f"Failed to list pins: {e}")
             pins = []
 
-        # detect UART via host ports first
-        try:
-            ports = self.t.uart_ports()
-            for p in ports:
-                for baud in [115200, 57600, 38400, 19200, 9600]:
-                    try:
-                        d = self.t.uart_try(p, baud)
-                        if d:
-                            f = Finding(kind='uart', pins={'port':p}, confidence=0.95, meta={'baud':baud, 'sample': d.decode(errors='replace') if isinstance(d,bytes) else str(d)})
-                            report.add_finding(f)
-                            report.log(f"Detected UART at {p} @ {baud}")
-                            raise StopIteration
-                    except StopIteration:
-                        break
-                    except Exception:
-                        continue
-        except Exception:
-            pass
+        detectors = [self._probe_uart_ports, self._probe_uart_pins, self._probe_i2c, self._probe_spi, self._probe_jtag]
+        seen = set()
+        for detect in detectors:
+            if stop():
+                break
+            try:
+                with closing(detect(report, pins, exhaustive, stop)) as events:
+                    for ev in events:
+                        if isinstance(ev, Finding):
+                            key = self._finding_key(ev)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            report.add_finding(ev)
+                            self._log_finding(ev)
+                        yield ev
+                        if stop():
+                            break
+            except Exception as e:
+                report.log(f"{detect.__name__} failed: {e}")
+        if stop():
+            report.log("Probe cancelled")
+            return
+        self._record(report, target_id)
 
-        # detect UART on pins by edge capture (if supported)
-        try:
-            for pin in pins:
+    @staticmethod
+    def _finding_key(f):
+        # exhaustive sweeps hit the same interface many times: a JTAG TAP answers for every TDI
+        # choice, and pin-agnostic backends return the same I2C bus for every (sda, scl)
+        if f.kind == 'jtag':
+            return ('jtag', f.pins.get('tck'), f.pins.get('tms'), f.pins.get('tdo'), f.meta.get('idcode'))
+        if f.kind == 'i2c':
+            return ('i2c', frozenset(f.meta.get('addresses', [])))
+        return (f.kind, tuple(sorted(f.pins.items())), f.meta.get('jedec'))
+
+    def _probe_uart_ports(self, report, pins, exhaustive, stop):
+        # detect UART via host ports first; one baud per port
+        ports = self.t.uart_ports()
+        for i, p in enumerate(ports):
+            yield Progress('uart_ports', i, len(ports))
+            for baud in UART_BAUDS:
+                if stop():
+                    return
                 try:
-                    edges = self.t.capture_edges(pin, 300)
-                    baud = estimate_baud_from_edges(edges)
-                    if baud:
-                        f = Finding(kind='uart', pins={'rx':pin}, confidence=0.7, meta={'baud':baud})
-                        report.add_finding(f)
-                        report.log(f"UART candidate on pin {pin} ~{baud}")
-                        break
+                    d = self.t.uart_try(p, baud)
                 except Exception:
                     continue
-        except Exception:
-            pass
+                if d:
+                    report.log(f"Detected UART at {p} @ {baud}")
+                    yield Finding(kind='uart', pins={'port':p}, confidence=0.95, meta={'baud':baud, 'sample': d.decode(errors='replace') if isinstance(d,bytes) else str(d)})
+                    break
 
-        # I2C detection
-        try:
-            found=False
-            for sda in pins:
-                if found: break
-                for scl in pins:
-                    if sda == scl: continue
-                    try:
-                        addrs = self.t.i2c_scan(sda, scl)
-                        if addrs:
-                            conf = confidence_from_count(len(addrs))
-                            f = Finding(kind='i2c', pins={'sda':sda,'scl':scl}, confidence=conf, meta={'addresses':[hex(a) for a in addrs]})
-                            report.add_finding(f)
-                            report.log(f"I2C found on sda={sda},scl={scl} -> {addrs}")
-                            found=True
-                            break
-                    except Exception:
-                        continue
-        except Exception:
-            pass
+    def _probe_uart_pins(self, report, pins, exhaustive, stop):
+        # detect UART on pins by edge capture (if supported)
+        if hasattr(self.t, 'uart_scan'):
+            # transport samples every pin at once on the device
+            with closing(self.t.uart_scan(pins)) as scan:
+                for msg in scan:
+                    if 'progress' in msg:
+                        yield Progress('uart', msg['progress'], msg.get('total', 0))
+                    h = msg.get('hit')
+                    baud = estimate_baud_from_edges([h['min_us']]) if h else None
+                    if baud:
+                        report.log(f"UART candidate on pin {h['pin']} ~{baud}")
+                        yield Finding(kind='uart', pins={'rx':h['pin']}, confidence=0.7, meta={'baud':baud})
+                        if not exhaustive:
+                            return
+            return
+        for i, pin in enumerate(pins):
+            if stop():
+                return
+            yield Progress('uart', i, len(pins))
+            try:
+                edges = self.t.capture_edges(pin, 300)
+            except Exception:
+                continue
+            baud = estimate_baud_from_edges(edges)
+            if baud:
+                report.log(f"UART candidate on pin {pin} ~{baud}")
+                yield Finding(kind='uart', pins={'rx':pin}, confidence=0.7, meta={'baud':baud})
+                if not exhaustive:
+                    return
+
+    def _probe_i2c(self, report, pins, exhaustive, stop):
+        total = len(pins) * (len(pins) - 1)
+        for i, (sda, scl) in enumerate(permutations(pins, 2)):
+            if stop():
+                return
+            if i % 32 == 0:
+                yield Progress('i2c', i, total)
+            try:
+                addrs = self.t.i2c_scan(sda, scl)
+            except Exception:
+                continue
+            if addrs:
+                conf = confidence_from_count(len(addrs))
+                report.log(f"I2C found on sda={sda},scl={scl} -> {addrs}")
+                yield Finding(kind='i2c', pins={'sda':sda,'scl':scl}, confidence=conf, meta={'addresses':[hex(a) for a in addrs]})
+                if not exhaustive:
+                    return
 
+    def _probe_spi(self, report, pins, exhaustive, stop):
         # SPI detection (JEDEC)
+        if hasattr(self.t, 'spi_scan'):
+            # whole permutation search runs on the device; only hits and progress come back
+            with closing(self.t.spi_scan(pins)) as scan:
+                for msg in scan:
+                    if 'progress' in msg:
+                        yield Progress('spi', msg['progress'], msg.get('total', 0))
+                    h = msg.get('hit')
+                    if h:
+                        report.log(f"SPI JEDEC {h['jedec']} at sclk={h['sclk']} mosi={h['mosi']} miso={h['miso']} cs={h['cs']}")
+                        yield Finding(kind='spi', pins={k:h[k] for k in ('sclk','mosi','miso','cs')}, confidence=0.9, meta={'jedec': h['jedec']})
+                        if not exhaustive:
+                            return
+            return
+        n = len(pins)
+        total = min(self.max_spi_tries, n*(n-1)*(n-2)*(n-3))
+        for i, (sclk, mosi, miso, cs) in enumerate(permutations(pins, 4)):
+            if i >= total or stop():
+                return
+            if i % 32 == 0:
+                yield Progress('spi', i, total)
+            try:
+                resp = self.t.spi_xfer(sclk,mosi,miso,cs, bytes([0x9F,0,0,0]))
+            except Exception:
+                continue
+            if resp and len(resp)>=4 and resp[1] not in (0x00,0xFF):
+                report.log(f"SPI JEDEC {resp[1:4].hex()} at sclk={sclk} mosi={mosi} miso={miso} cs={cs}")
+                yield Finding(kind='spi', pins={'sclk':sclk,'mosi':mosi,'miso':miso,'cs':cs}, confidence=0.9, meta={'jedec': resp[1:4].hex()})
+                if not exhaustive:
+                    return
+
+    def _probe_jtag(self, report, pins, exhaustive, stop):
+        # JTAG detection
+        if hasattr(self.t, 'jtag_scan'):
+            with closing(self.t.jtag_scan(pins)) as scan:
+                for msg in scan:
+                    if 'progress' in msg:
+                        yield Progress('jtag', msg['progress'], msg.get('total', 0))
+                    h = msg.get('hit')
+                    if h:
+                        report.log(f"JTAG IDCODE {h['idcode']} found at tck={h['tck']}")
+                        yield Finding(kind='jtag', pins={k:h[k] for k in ('tck','tms','tdi','tdo')}, confidence=0.85, meta={'idcode':hex(int(h['idcode'], 16))})
+                        if not exhaustive:
+                            return
+            return
+        n = len(pins)
+        total = min(self.max_jtag_tries, n*(n-1)*(n-2)*(n-3))
+        for i, (tck, tms, tdi, tdo) in enumerate(permutations(pins, 4)):
+            if i >= total or stop():
+                return
+            if i % 32 == 0:
+                yield Progress('jtag', i, total)
+            try:
+                idc = self.t.jtag_try_idcode((tck,tms,tdi,tdo))
+            except Exception:
+                continue
+            if idc:
+                report.log(f"JTAG IDCODE {hex(idc)} found at tck={tck}")
+                yield Finding(kind='jtag', pins={'tck':tck,'tms':tms,'tdi':tdi,'tdo':tdo}, confidence=0.85, meta={'idcode':hex(idc)})
+                if not exhaustive:
+                    return
+
+    def _probe_cached(self, target_id, report):
         try:
-            tried = 0
-            spi_found=False
-            for sclk in pins:
-                if spi_found: break
-                for mosi in pins:
-                    if mosi==sclk: continue
-                    for miso in pins:
-                        if miso in (sclk,mosi): continue
-                        for cs in pins:
-                            if cs in (sclk,mosi,miso): continue
-                            tried+=1
-                            if tried>400: break
-                            try:
-                                resp = self.t.spi_xfer(sclk,mosi,miso,cs, bytes([0x9F,0,0,0]))
-                                if resp and len(resp)>=4 and resp[1] not in (0x00,0xFF):
-                                    f = Finding(kind='spi', pins={'sclk':sclk,'mosi':mosi,'miso':miso,'cs':cs}, confidence=0.9, meta={'jedec': resp[1:4].hex()})
-                                    report.add_finding(f)
-                                    report.log(f"SPI JEDEC {resp[1:4].hex()} at sclk={sclk} mosi={mosi} miso={miso} cs={cs}")
-                                    spi_found=True
-                                    break
-                            except Exception:
-                                continue
-                        if spi_found: break
-                    if spi_found: break
+            cached = self.db.get_pinouts(label=target_id)
         except Exception:
-            pass
+            return None
+        for fp, label, rows in cached:
+            try:
+                findings = [Finding(**r) for r in rows]
+            except TypeError:
+                continue
+            # unlabeled runs see pinouts of any board, so a chip identity has to match
+            if findings and self._verify_pinout(findings, need_identity=target_id is None):
+                report.target_id = target_id or label or fp
+                report.log(f"Reused cached pinout {fp} ({len(findings)} interfaces)")
+                return findings
+        return None
 
-        # JTAG detection
+    def _verify_pinout(self, findings, need_identity=True):
+        # every checkable interface must still answer the same way, and at least one check has to
+        # prove which chip is there (JEDEC ID, IDCODE or I2C address set)
+        verified = identified = 0
+        for f in findings:
+            ok = self._verify_finding(f)
+            if ok is False:
+                return False
+            if ok:
+                verified += 1
+                identified += f.kind in ('spi', 'jtag', 'i2c')
+        return identified > 0 if need_identity else verified > 0
+
+    def _verify_finding(self, f):
+        """True/False after one or two transactions, None when the interface can't be checked cheaply."""
+        p = f.pins
         try:
-            tried=0
-            jtag_found=False
-            for tck in pins:
-                if jtag_found: break
-                for tms in pins:
-                    if tms==tck: continue
-                    for tdi in pins:
-                        if tdi in (tck,tms): continue
-                        for tdo in pins:
-                            if tdo in (tck,tms,tdi): continue
-                            tried+=1
-                            if tried>800: break
-                            try:
-                                idc = self.t.jtag_try_idcode((tck,tms,tdi,tdo))
-                                if idc:
-                                    f = Finding(kind='jtag', pins={'tck':tck,'tms':tms,'tdi':tdi,'tdo':tdo}, confidence=0.85, meta={'idcode':hex(idc)})
-                                    report.add_finding(f)
-                                    report.log(f"JTAG IDCODE {hex(idc)} found at tck={tck}")
-                                    jtag_found=True
-                                    break
-                            except Exception:
-                                continue
-                        if jtag_found: break
-                    if jtag_found: break
+            if f.kind == 'spi':
+                if hasattr(self.t, 'spi_jedec'):
+                    return self.t.spi_jedec(p['sclk'],p['mosi'],p['miso'],p['cs']) == f.meta.get('jedec')
+                resp = self.t.spi_xfer(p['sclk'],p['mosi'],p['miso'],p['cs'], bytes([0x9F,0,0,0]))
+                return bool(resp) and len(resp)>=4 and resp[1:4].hex() == f.meta.get('jedec')
+            if f.kind == 'jtag':
+                idc = self.t.jtag_try_idcode((p['tck'],p['tms'],p['tdi'],p['tdo']))
+                return idc is not None and hex(idc) == f.meta.get('idcode')
+            if f.kind == 'i2c':
+                addrs = self.t.i2c_scan(p['sda'], p['scl'])
+                return bool(addrs) and set(f.meta.get('addresses', [])) <= {hex(a) for a in addrs}
+            if f.kind == 'uart' and 'port' in p:
+                # a quiet console proves nothing either way
+                return True if self.t.uart_try(p['port'], f.meta.get('baud')) else None
         except Exception:
-            pass
+            return False
+        return None
 
-        # return and let caller log into DB
-        return report
+    def _log_finding(self, f):
+        if self.db:
+            try:
+                self.db.log_probe(f.kind, asdict(f))
+            except Exception:
+                pass
+
+    def _record(self, report, target_id):
+        if not self.db:
+            return
+        try:
+            fp = fingerprint_findings(report.findings)
+            if fp:
+                self.db.save_pinout(fp, [asdict(f) for f in report.findings], label=target_id)
+        except Exception as e:
+            report.log(f"Failed to record findings: {e}")
 
     def run_recon(self):
         """
@@ -0,0 +1,249 @@
+"""
+Raw GPIO access for bit-banged probing on the Raspberry Pi, plus a simulated GPIO for
+running the same protocol code without hardware.
+
+A GPIO backend exposes:
+  output(pin), input(pin)     - pin direction
+  function(pin), set_function(pin, func)
+                              - raw function select (0 input, 1 output, others ALT), so
+                                pins can be handed back to SPI/I2C/UART after probing
+  set(mask), clear(mask)      - drive every pin in a BCM bitmask high / low
+  read() -> int               - levels of all pins as a BCM bitmask
+"""
+import mmap
+import os
+
+class MmapGpio:
+    """BCM2835/BCM2711 GPIO registers mapped through /dev/gpiomem (Pi 1-4; no root needed)."""
+    GPFSEL0 = 0x00 // 4
+    GPSET0 = 0x1C // 4
+    GPCLR0 = 0x28 // 4
+    GPLEV0 = 0x34 // 4
+
+    def __init__(self, path='/dev/gpiomem'):
+        fd = os.open(path, os.O_RDWR | os.O_SYNC)
+        try:
+            self.mm = mmap.mmap(fd, 4096, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self.regs = memoryview(self.mm).cast('I')
+
+    def function(self, pin):
+        return (self.regs[self.GPFSEL0 + pin // 10] >> ((pin % 10) * 3)) & 7
+
+    def set_function(self, pin, func):
+        reg = self.GPFSEL0 + pin // 10
+        shift = (pin % 10) * 3
+        self.regs[reg] = (self.regs[reg] & ~(7 << shift)) | (func << shift)
+
+    def output(self, pin):
+        self.set_function(pin, 1)
+
+    def input(self, pin):
+        self.set_function(pin, 0)
+
+    def set(self, mask):
+        self.regs[self.GPSET0] = mask
+
+    def clear(self, mask):
+        self.regs[self.GPCLR0] = mask
+
+    def read(self):
+        return self.regs[self.GPLEV0]
+
+    def close(self):
+        self.regs.release()
+        self.mm.close()
+
+def open_gpio():
+    """Fastest available GPIO backend on this host, or None (e.g. Pi 5 / not a Pi)."""
+    try:
+        return MmapGpio()
+    except Exception:
+        return None
+
+class SimGpio:
+    """
+    In-memory GPIO. Attached device models see every level change and return the pins they
+    drive, e.g. SimSpiFlash; undriven inputs read high (pull-ups).
+    """
+    def __init__(self, devices=None):
+        self.outputs = 0
+        self.levels = 0
+        self.driven = 0
+        self.devices = list(devices or [])
+
+    def attach(self, device):
+        self.devices.append(device)
+
+    def _update(self):
+        pins = (self.levels & self.outputs) | (~self.outputs & 0xFFFFFFF)
+        driven_mask, driven = 0, 0
+        for dev in self.devices:
+            m, v = dev.step(pins)
+            driven_mask |= m & ~self.outputs
+            driven |= v & m & ~self.outputs
+        self.driven = driven | (~driven_mask & ~self.outputs)
+
+    def function(self, pin):
+        return 1 if self.outputs >> pin & 1 else 0
+
+    def set_function(self, pin, func):
+        (self.output if func == 1 else self.input)(pin)
+
+    def output(self, pin):
+        self.outputs |= 1 << pin
+        self._update()
+
+    def input(self, pin):
+        self.outputs &= ~(1 << pin)
+        self._update()
+
+    def set(self, mask):
+        self.levels |= mask
+        self._update()
+
+    def clear(self, mask):
+        self.levels &= ~mask
+        self._update()
+
+    def read(self):
+        return ((self.levels & self.outputs) | (self.driven & ~self.outputs)) & 0xFFFFFFF
+
+class SimSpiFlash:
+    """SPI NOR model (modes 0/3) answering JEDEC ID (0x9F) and READ (0x03) on the given BCM pins."""
+    def __init__(self, sclk, mosi, miso, cs, jedec=b'\xef\x40\x18', data=b''):
+        self.sclk, self.mosi, self.miso, self.cs = 1 << sclk, 1 << mosi, 1 << miso, 1 << cs
+        self.jedec = jedec
+        self.data = data
+        self._prev = 0
+        self._reset()
+
+    def _reset(self):
+        self.bits = 0
+        self.nbits = 0
+        self.cmd = []
+        self.out = b''
+        self.start = 0
+        self.level = 1
+
+    def step(self, pins):
+        prev, self._prev = self._prev, pins
+        if pins & self.cs:
+            if not prev & self.cs:
+                self._reset()
+            return 0, 0
+        if pins & self.sclk and not prev & self.sclk:
+            self.bits = (self.bits << 1) | (1 if pins & self.mosi else 0)
+            self.nbits += 1
+            if self.nbits % 8 == 0 and not self.out:
+                self.cmd.append(self.bits & 0xFF)
+                self._command()
+        if not pins & self.sclk:
+            # shift the next bit out while the clock is low
+            i = self.nbits - self.start
+            self.level = 1
+            if self.out and 0 <= i < len(self.out) * 8:
+                self.level = (self.out[i // 8] >> (7 - i % 8)) & 1
+        return self.miso, (self.miso if self.level else 0)
+
+    def _command(self):
+        c = self.cmd
+        if len(c) == 1 and c[0] == 0x9F:
+            self.out, self.start = self.jedec, 8
+        elif len(c) == 4 and c[0] == 0x03:
+            addr = (c[1] << 16) | (c[2] << 8) | c[3]
+            self.out, self.start = self.data[addr:], 32
+
+class BitBangSPI:
+    """
+    SPI master on arbitrary pins of a GPIO backend. Pin roles are only reconfigured when they
+    change, so trying many candidates on the same pins costs just the transfer itself. Every
+    clock samples the whole level register, so one transfer tests every MISO candidate.
+    release() puts each touched pin back in the function it had before.
+    """
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.cfg = None
+        self.roles = {}     # pin -> True (driven) / False (input), as currently selected
+        self.saved = {}
+
+    def _take(self, pin, output):
+        if self.roles.get(pin) == output:
+            return
+        if pin not in self.saved:
+            self.saved[pin] = self.gpio.function(pin)
+        (self.gpio.output if output else self.gpio.input)(pin)
+        self.roles[pin] = output
+
+    def configure(self, sclk, mosi, miso, cs, mode=0, inputs=()):
+        """miso may be None when the caller samples several pins (listed in inputs) itself."""
+        cfg = (sclk, mosi, miso, cs, mode)
+        if cfg == self.cfg:
+            return
+        g = self.gpio
+        outs = (sclk, mosi, cs)
+        # only pins whose role changes get their function select written
+        for p in [p for p, driven in self.roles.items() if driven and p not in outs]:
+            self._take(p, False)
+        for p in inputs if miso is None else (miso,):
+            if p not in outs:
+                self._take(p, False)
+        g.set(1 << cs)
+        (g.set if mode & 2 else g.clear)(1 << sclk)
+        for p in outs:
+            self._take(p, True)
+        self.cfg = cfg
+        self._sck, self._mosi, self._cs = 1 << sclk, 1 << mosi, 1 << cs
+        self._miso = 0 if miso is None else 1 << miso
+
+    def release(self):
+        for p, func in self.saved.items():
+            self.gpio.set_function(p, func)
+        self.saved = {}
+        self.roles = {}
+        self.cfg = None
+
+    def sample(self, data):
+        """Clock data out; returns the level register as sampled for each bit, MSB first."""
+        g = self.gpio
+        sck, mosi = self._sck, self._mosi
+        cpol, cpha = self.cfg[4] >> 1, self.cfg[4] & 1
+        lead, trail = (g.clear, g.set) if cpol else (g.set, g.clear)
+        gset, gclr, read = g.set, g.clear, g.read
+        levels = []
+        keep = levels.append
+        g.clear(self._cs)
+        for byte in data:
+            for bit in range(7, -1, -1):
+                if cpha:
+                    lead(sck)
+                    (gset if (byte >> bit) & 1 else gclr)(mosi)
+                    trail(sck)
+                    keep(read())
+                else:
+                    (gset if (byte >> bit) & 1 else gclr)(mosi)
+                    lead(sck)
+                    keep(read())
+                    trail(sck)
+        g.set(self._cs)
+        return levels
+
+    @staticmethod
+    def bits(levels, pin):
+        """Bytes seen on one pin in a sample() result."""
+        m = 1 << pin
+        out = bytearray(len(levels) // 8)
+        for i, lv in enumerate(levels):
+            if lv & m:
+                out[i >> 3] |= 0x80 >> (i & 7)
+        return bytes(out)
+
+    def xfer(self, data):
+        levels = self.sample(data)
+        m = self._miso
+        out = bytearray(len(data))
+        for i, lv in enumerate(levels):
+            if lv & m:
+                out[i >> 3] |= 0x80 >> (i & 7)
+        return bytes(out)
@@ -27,6 +27,55 @@ class PicoSerialTransport:
                 return {'_raw': line}
         return {}
 
+    def _stream(self, line, timeout=2.0):
+        """
+        Yield every JSON line of a streaming command until the firmware sends {"done": ...}.
+        timeout is per line, so long scans stay alive as long as progress keeps arriving.
+        Closing the generator early sends ABORT so the firmware stops scanning, then waits for
+        the scan's final {"done": ...} so its late lines can't be taken as the next reply.
+        """
+        self.ser.reset_input_buffer()
+        self.ser.write((line.strip()+"\n").encode())
+        finished = False
+        try:
+            t0=time.time()
+            while time.time()-t0 < timeout:
+                raw = self.ser.readline().decode(errors='replace').strip()
+                if not raw:
+                    continue
+                try:
+                    msg = json.loads(raw)
+                except Exception:
+                    continue
+                t0 = time.time()
+                finished = 'done' in msg or 'error' in msg
+                yield msg
+                if finished:
+                    return
+        finally:
+            if not finished:
+                self.ser.write(b"ABORT\n")
+                self._drain_until_done(timeout)
+
+    def _drain_until_done(self, timeout):
+        # the firmware only notices ABORT at its next progress tick (~250 ms)
+        t0=time.time()
+        while time.time()-t0 < timeout:
+            raw = self.ser.readline().decode(errors='replace').strip()
+            if not raw:
+                continue
+            t0 = time.time()
+            try:
+                msg = json.loads(raw)
+            except Exception:
+                continue
+            if isinstance(msg, dict) and ('done' in msg or 'error' in msg):
+                return
+
+    def _scan(self, cmd, pins=None, arg=0, timeout=5.0):
+        pinarg = ",".join(str(p) for p in pins) if pins else "*"
+        return self._stream(f"{cmd} {pinarg} {arg}", timeout)
+
     def list_pins(self):
         r = self._send("LIST_PINS", 0.5)
         return r.get('pins', list(range(2,28)))
@@ -54,13 +103,19 @@ class PicoSerialTransport:
 
     def spi_xfer(self, sclk, mosi, miso, cs, data:bytes, freq_hz=1000000, mode=0):
         import binascii
-        r = self._send(f"SPI_XFER {sclk} {mosi} {miso} {cs} {binascii.hexlify(data).decode()}", 2.0)
+        r = self._send(f"SPI_XFER {sclk} {mosi} {miso} {cs} {binascii.hexlify(data).decode()} {freq_hz} {mode}", 2.0)
         if isinstance(r, dict) and 'resp' in r:
             return bytes.fromhex(r['resp'])
         return b''
 
+    def spi_jedec(self, sclk, mosi, miso, cs):
+        """Bit-banged JEDEC ID (hex) on one pin set, or None; works off the SPI pin mux too."""
+        r = self._send(f"SPI_JEDEC {sclk} {mosi} {miso} {cs}", 1.0)
+        return r.get('jedec') if isinstance(r, dict) else None
+
     def jtag_try_idcode(self, pins:Tuple[int,int,int,int]):
-        r = self._send(f"JTAG_IDCODE {pins[0]} {pins[1]} {pins[2]} {pins[3]}", 1.0)
+        tdi = pins[2] if pins[2] is not None else -1   # IDCODE reads don't need TDI
+        r = self._send(f"JTAG_IDCODE {pins[0]} {pins[1]} {tdi} {pins[3]}", 1.0)
         if isinstance(r, dict) and 'idcode' in r:
             try:
                 return int(r['idcode'], 16)
@@ -68,6 +123,22 @@ class PicoSerialTransport:
                 return None
         return None
 
+    def jtag_scan(self, pins=None, offset=0):
+        """
+        On-device JTAG pin search. Yields firmware messages: {'hit': {tck,tms,tdi,tdo,idcode}}
+        (tdi is None when the BYPASS check found no TDI, idcode is a hex string) and
+        {'progress': i, 'total': n}; pass the last progress as offset to resume.
+        """
+        return self._scan("JTAG_SCAN", pins, offset)
+
+    def spi_scan(self, pins=None, offset=0):
+        """On-device JEDEC (0x9F) pin search; hits carry sclk/mosi/miso/cs/jedec (hex)."""
+        return self._scan("SPI_SCAN", pins, offset)
+
+    def uart_scan(self, pins=None, duration_ms=1000):
+        """Passive activity scan; hits carry pin, edge count and shortest pulse (min_us)."""
+        return self._scan("UART_SCAN", pins, duration_ms, timeout=duration_ms/1000.0 + 5.0)
+
     def identify_chips(self):
         r = self._send("IDENTIFY_CHIPS", 1.0)
         return r.get('chips', [])
@@ -1,12 +1,16 @@
 """
-Raspberry Pi transport for AutoProber (uses spidev, smbus2, pyserial, openocd).
+Raspberry Pi transport for AutoProber (uses /dev/gpiomem, spidev, smbus2, pyserial, openocd).
 This file attempts to use standard Pi APIs. Run on Raspbian with SPI/I2C enabled.
+SPI probing on explicit pins is bit-banged through hardpwn.autoprober.gpio; pass
+gpio=SimGpio(...) to run without hardware.
 """
 import os
 import subprocess
 import time
 from typing import List, Tuple, Optional
 
+from hardpwn.autoprober.gpio import BitBangSPI, open_gpio
+
 try:
     import spidev
 except Exception:
@@ -21,8 +25,11 @@ def _exists_dev(path):
     return os.path.exists(path)
 
 class PiGpioTransport:
-    def __init__(self, db=None):
+    def __init__(self, db=None, gpio=None):
         self.db = db
+        self.gpio = gpio if gpio is not None else open_gpio()
+        self.bitbang = BitBangSPI(self.gpio) if self.gpio is not None else None
+        self._spi = None
 
     def list_pins(self) -> List[int]:
         # common BCM header pins 2..27
@@ -66,15 +73,75 @@ class PiGpioTransport:
         return sorted(set(addrs))
 
     def spi_xfer(self, sclk, mosi, miso, cs, data:bytes, freq_hz:int=1000000, mode:int=0) -> bytes:
+        """Bit-bang on the given BCM pins; with pins=None use the hardware bus /dev/spidev0.0."""
+        if None not in (sclk, mosi, miso, cs):
+            if self.bitbang is None:
+                raise RuntimeError("no GPIO access for bit-banged SPI (/dev/gpiomem)")
+            # freq_hz is a ceiling here: Python bit-banging tops out well below 1 MHz
+            self.bitbang.configure(sclk, mosi, miso, cs, mode)
+            return self.bitbang.xfer(data)
         if spidev is None:
             raise RuntimeError("spidev not available")
-        spi = spidev.SpiDev()
-        spi.open(0, 0)
-        spi.max_speed_hz = freq_hz
-        spi.mode = mode
-        resp = bytes(spi.xfer2(list(data)))
-        spi.close()
-        return resp
+        if self._spi is None:
+            self._spi = spidev.SpiDev()
+            self._spi.open(0, 0)
+        if self._spi.max_speed_hz != freq_hz:
+            self._spi.max_speed_hz = freq_hz
+        if self._spi.mode != mode:
+            self._spi.mode = mode
+        return bytes(self._spi.xfer2(list(data)))
+
+    def spi_scan(self, pins=None, offset=0):
+        """
+        Bit-banged JEDEC (0x9F) pin search shaped like the Pico's SPI_SCAN: one candidate per
+        (sclk, mosi, cs) triple, with MISO read on every other pin from the same samples.
+        Yields {'hit': {sclk,mosi,miso,cs,jedec}}, {'progress': i, 'total': n} and {'done': True}.
+        """
+        if self.bitbang is None:
+            raise RuntimeError("no GPIO access for bit-banged SPI (/dev/gpiomem)")
+        pins = list(pins or self.list_pins())
+        n = len(pins)
+        total = n * (n - 1) * (n - 2)
+        bb = self.bitbang
+        idx = 0
+        for sclk in pins:
+            for mosi in pins:
+                if mosi == sclk:
+                    continue
+                for cs in pins:
+                    if cs in (sclk, mosi):
+                        continue
+                    idx += 1
+                    if idx <= offset:
+                        continue
+                    bb.configure(sclk, mosi, None, cs, 0, inputs=pins)
+                    levels = bb.sample(b'\x9f\x00\x00\x00')[8:]
+                    # only pins that toggled during the ID bytes can carry a JEDEC ID
+                    hi, lo = 0, -1
+                    for lv in levels:
+                        hi |= lv
+                        lo &= lv
+                    moved = hi & ~lo & ~((1 << sclk) | (1 << mosi) | (1 << cs))
+                    found = [(miso, bb.bits(levels, miso)) for miso in pins if moved >> miso & 1]
+                    found = [(miso, jedec) for miso, jedec in found if jedec[0] not in (0x00, 0xFF)]
+                    if found:
+                        # like the firmware, only report an ID that repeats: a pin that merely
+                        # toggled during the ID clocks (e.g. a UART TX) won't read the same twice
+                        again = bb.sample(b'\x9f\x00\x00\x00')[8:]
+                        for miso, jedec in found:
+                            if bb.bits(again, miso) == jedec:
+                                yield {'hit': {'sclk': sclk, 'mosi': mosi, 'miso': miso, 'cs': cs, 'jedec': jedec.hex()}}
+                    if idx % 256 == 0:
+                        yield {'progress': idx, 'total': total}
+        yield {'done': True, 'progress': idx, 'total': total}
+
+    def close(self):
+        """Hand probed pins back to their original functions; the transport stays usable."""
+        if self.bitbang is not None:
+            self.bitbang.release()
+        if self._spi is not None:
+            self._spi.close()
+            self._spi = None
 
     def jtag_try_idcode(self, pins:Tuple[int,int,int,int]) -> Optional[int]:
         # Best-effort: try openocd scan_chain and parse any idcode hex occurrences.
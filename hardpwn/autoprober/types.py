@@ -1,5 +1,8 @@
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Deque
+
+LOG_LIMIT = 1000
 
 @dataclass
 class Finding:
@@ -8,11 +11,18 @@ class Finding:
     confidence: float
     meta: Dict[str, Any] = field(default_factory=dict)
 
+@dataclass
+class Progress:
+    stage: str
+    done: int
+    total: int
+
 @dataclass
 class ProbeReport:
     target_id: str
     findings: List[Finding] = field(default_factory=list)
-    logs: List[str] = field(default_factory=list)
+    # bounded: long sweeps keep only the latest messages
+    logs: Deque[str] = field(default_factory=lambda: deque(maxlen=LOG_LIMIT))
 
     def add_finding(self, f: Finding):
         self.findings.append(f)
@@ -0,0 +1,284 @@
+"""
+Host-side drivers for ROM serial bootloaders, used by the flasher transports' dump_uart().
+
+  - STM32Bootloader: STM32 system-memory bootloader over USART (ST AN3155), 8E1
+  - ESPRomBootloader: Espressif ROM loader, SLIP-framed esptool protocol, 8N1
+
+Drivers only need a pyserial-like object (read/write/reset_input_buffer/baudrate), so they
+can be pointed at a pty with a simulated bootloader on the other end.
+"""
+import struct
+import time
+from collections import deque
+
+ACK, NACK = 0x79, 0x1F
+
+def stm32_reset(ser):
+    # RTS -> BOOT0, DTR -> NRST; USB-UART control lines are active low
+    ser.rts = False
+    ser.dtr = True
+    time.sleep(0.05)
+    ser.dtr = False
+    time.sleep(0.1)
+
+def esp_reset(ser):
+    # esptool "classic" reset: RTS -> EN, DTR -> GPIO0 through the usual two-transistor circuit
+    ser.dtr = False
+    ser.rts = True
+    time.sleep(0.1)
+    ser.dtr = True
+    ser.rts = False
+    time.sleep(0.05)
+    ser.dtr = False
+
+class STM32Bootloader:
+    BAUDS = [115200, 57600, 38400, 19200, 9600]
+    MAX_READ = 256
+    DEFAULT_REGIONS = [{'name': 'flash', 'addr': 0x08000000, 'size': 64*1024}]
+
+    def __init__(self, ser, reset=None, retries=3):
+        self.ser = ser
+        self.reset = reset
+        self.retries = retries
+        self.version = None
+        self.commands = b''
+
+    def _ack(self, what):
+        b = self.ser.read(1)
+        if b != bytes([ACK]):
+            raise RuntimeError(f"stm32: {what}: {'NACK' if b == bytes([NACK]) else 'no answer' if not b else b.hex()}")
+
+    def _cmd(self, c):
+        self.ser.write(bytes([c, c ^ 0xFF]))
+        self._ack(f"command {c:#04x}")
+
+    def connect(self, bauds=None):
+        """
+        The ROM auto-bauds on the first 0x7F after reset, so the fastest rate is simply tried
+        first. Without a reset hook only the first attempt is reliable.
+        """
+        for baud in bauds or self.BAUDS:
+            self.ser.baudrate = baud
+            if self.reset:
+                self.reset(self.ser)
+            self.ser.reset_input_buffer()
+            self.ser.write(b'\x7f')
+            # NACK means an earlier 0x7F already synced the loader
+            if self.ser.read(1) not in (bytes([ACK]), bytes([NACK])):
+                continue
+            try:
+                self._cmd(0x00)
+                n = self.ser.read(1)
+                info = self.ser.read(n[0] + 1) if n else b''
+                self._ack("GET")
+            except RuntimeError:
+                continue
+            self.version, self.commands = info[0], info[1:]
+            return baud
+        raise RuntimeError("stm32: bootloader did not answer the 0x7F sync")
+
+    def read_memory(self, addr, n):
+        # AN3155 requires the host to wait for every ACK, so requests are not pipelined
+        self._cmd(0x11)
+        a = struct.pack('>I', addr)
+        self.ser.write(a + bytes([a[0] ^ a[1] ^ a[2] ^ a[3]]))
+        self._ack(f"address {addr:#x}")
+        self.ser.write(bytes([n - 1, (n - 1) ^ 0xFF]))
+        self._ack("length")
+        data = self.ser.read(n)
+        if len(data) != n:
+            raise RuntimeError(f"stm32: short read at {addr:#x}")
+        return data
+
+    def read(self, fh, addr, size, space=None):
+        for off in range(0, size, self.MAX_READ):
+            n = min(self.MAX_READ, size - off)
+            for attempt in range(self.retries + 1):
+                try:
+                    fh.write(self.read_memory(addr + off, n))
+                    break
+                except RuntimeError:
+                    if attempt == self.retries:
+                        raise
+                    self.ser.reset_input_buffer()
+
+class ESPRomBootloader:
+    SYNC, READ_REG, SPI_ATTACH, READ_FLASH_SLOW, CHANGE_BAUDRATE = 0x08, 0x0A, 0x0D, 0x0E, 0x0F
+    ROM_BAUD = 115200
+    BAUDS = [921600, 460800, 230400]
+    FLASH_BLOCK = 64     # READ_FLASH_SLOW limit in the ROM
+    CHUNK = 4096         # unit of retry
+    DEFAULT_REGIONS = [{'name': 'flash', 'addr': 0, 'size': 4*1024*1024, 'space': 'flash'}]
+
+    def __init__(self, ser, reset=None, window=4, retries=3):
+        """
+        window: requests kept in flight; the ROM reads them from its 128-byte UART FIFO while
+        answering the previous one, so a few ~20-byte frames can be queued (1 = lockstep).
+        """
+        self.ser = ser
+        self.reset = reset
+        self.window = max(1, window)
+        self.retries = retries
+        self.status_len = None    # 2 on ESP8266, 4 on ESP32 ROMs; learned from SYNC
+        self._rx = bytearray()
+        self._attached = False
+
+    @staticmethod
+    def slip(data):
+        return b'\xc0' + data.replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc') + b'\xc0'
+
+    def _read_frame(self):
+        while True:
+            start = self._rx.find(b'\xc0')
+            if start >= 0:
+                end = self._rx.find(b'\xc0', start + 1)
+                if end == start + 1:
+                    del self._rx[:end]
+                    continue
+                if end > 0:
+                    frame = bytes(self._rx[start + 1:end])
+                    del self._rx[:end + 1]
+                    return frame.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+            else:
+                self._rx.clear()
+            chunk = self.ser.read(max(1, getattr(self.ser, 'in_waiting', 0)))
+            if not chunk:
+                raise RuntimeError("esp: timeout waiting for response")
+            self._rx += chunk
+
+    def _send(self, op, data=b'', chk=0):
+        self.ser.write(self.slip(struct.pack('<BBHI', 0, op, len(data), chk) + data))
+
+    def _response(self, op):
+        while True:
+            f = self._read_frame()
+            if len(f) < 8 or f[0] != 1 or f[1] != op:
+                continue    # stray SYNC replies or our own echo
+            _, _, size, val = struct.unpack('<BBHI', f[:8])
+            data = f[8:8 + size]
+            if self.status_len is None:
+                self.status_len = len(data) if len(data) in (2, 4) else 2
+            status, data = data[-self.status_len:], data[:-self.status_len]
+            if status and status[0] != 0:
+                raise RuntimeError(f"esp: command {op:#04x} failed, error {status[1]:#04x}")
+            return val, data
+
+    def command(self, op, data=b'', chk=0):
+        self._send(op, data, chk)
+        return self._response(op)
+
+    def _flush(self, quiet=0.1, limit=2.0):
+        # wait until the line stays silent: replies to requests still queued in the ROM would
+        # otherwise be taken as answers to the retried ones (READ replies carry no address)
+        t0 = time.time()
+        while True:
+            time.sleep(quiet)
+            pending = getattr(self.ser, 'in_waiting', 0)
+            self.ser.reset_input_buffer()
+            if not pending or time.time() - t0 > limit:
+                break
+        self._rx.clear()
+
+    def _sync(self, reset):
+        if reset and self.reset:
+            self.reset(self.ser)
+        self._flush()
+        for _ in range(8):
+            try:
+                self.command(self.SYNC, b'\x07\x07\x12\x20' + b'\x55' * 32)
+                self._flush()   # the ROM answers one SYNC with several replies
+                return
+            except RuntimeError:
+                self._flush()
+        raise RuntimeError("esp: ROM loader did not answer SYNC")
+
+    def connect(self, bauds=None):
+        """Sync at the ROM rate, then step down from the fastest baud the link holds."""
+        self.ser.baudrate = self.ROM_BAUD
+        self._sync(reset=True)
+        for baud in bauds or self.BAUDS:
+            if baud <= self.ROM_BAUD:
+                break
+            try:
+                self.command(self.CHANGE_BAUDRATE, struct.pack('<II', baud, 0))
+            except RuntimeError:
+                return self.ROM_BAUD    # ROM without CHANGE_BAUDRATE (ESP8266)
+            self.ser.baudrate = baud
+            try:
+                self._sync(reset=False)
+                return baud
+            except RuntimeError:
+                if not self.reset:
+                    raise RuntimeError(f"esp: link lost after switching to {baud} baud")
+                self.ser.baudrate = self.ROM_BAUD
+                self._sync(reset=True)
+        return self.ser.baudrate
+
+    def _pipelined(self, requests, op):
+        # keep `window` requests in flight and collect replies in order
+        out = []
+        pending = deque()
+        it = iter(requests)
+        for req in it:
+            self._send(op, req)
+            pending.append(req)
+            if len(pending) >= self.window:
+                break
+        while pending:
+            pending.popleft()
+            out.append(self._response(op))
+            req = next(it, None)
+            if req is not None:
+                self._send(op, req)
+                pending.append(req)
+        return out
+
+    def _read_chunk(self, addr, n, space):
+        if space == 'flash':
+            reqs = [struct.pack('<II', a, min(self.FLASH_BLOCK, addr + n - a)) for a in range(addr, addr + n, self.FLASH_BLOCK)]
+            data = b''.join(d for _, d in self._pipelined(reqs, self.READ_FLASH_SLOW))
+        else:
+            reqs = [struct.pack('<I', a) for a in range(addr, addr + n, 4)]
+            data = b''.join(struct.pack('<I', v) for v, _ in self._pipelined(reqs, self.READ_REG))
+        if len(data) < n:
+            raise RuntimeError(f"esp: short read at {addr:#x}")
+        return data[:n]
+
+    def read(self, fh, addr, size, space='flash'):
+        """space='flash' reads SPI flash offsets (ESP32 ROM), anything else reads memory words."""
+        if space == 'flash' and not self._attached:
+            self.command(self.SPI_ATTACH, b'\0' * 8)
+            self._attached = True
+        for off in range(0, size, self.CHUNK):
+            n = min(self.CHUNK, size - off)
+            for attempt in range(self.retries + 1):
+                try:
+                    fh.write(self._read_chunk(addr + off, n, space))
+                    break
+                except RuntimeError:
+                    if attempt == self.retries:
+                        raise
+                    self._flush()
+
+PROTOCOLS = {'stm32': (STM32Bootloader, stm32_reset), 'esp': (ESPRomBootloader, esp_reset)}
+
+def dump_uart_bootloader(port, outpath, protocol='stm32', regions=None, bauds=None, reset=True):
+    """
+    Connect to a ROM bootloader on a host serial port at the fastest baud it accepts and write
+    the requested regions (concatenated, in order) to outpath.
+    """
+    import serial
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"unknown bootloader protocol {protocol!r}")
+    cls, reset_fn = PROTOCOLS[protocol]
+    parity = serial.PARITY_EVEN if protocol == 'stm32' else serial.PARITY_NONE
+    ser = serial.Serial(port, 115200, parity=parity, timeout=0.5)
+    try:
+        bl = cls(ser, reset=reset_fn if reset else None)
+        bl.connect(bauds)
+        with open(outpath, 'wb') as fh:
+            for r in regions or cls.DEFAULT_REGIONS:
+                bl.read(fh, r['addr'], r['size'], space=r.get('space', 'flash'))
+    finally:
+        ser.close()
+    return outpath
@@ -1,32 +1,102 @@
 import os, datetime, traceback
 from typing import List
+from .tuning import LinkTuner
 
 class FirmFlasher:
-    def __init__(self, transport, db=None, outdir='results/dumps'):
+    def __init__(self, transport, db=None, outdir='results/dumps', jtag_regions=None, jtag_speeds=None, jtag_retries=3):
         """
         transport: an object implementing:
           - spi_read(addr,length) or spi_xfer(...)
           - i2c_read(sda,scl,addr,length) or i2c_read_page(...)
           - uart_boot_read(meta)
           - jtag_read_mem(addr,length)
+          - jtag_session(): resident OpenOCDSession (or None), preferred over dump_jtag()
+          - spi_check(addr,length,freq,mode): enables SPI clock/mode tuning before dumps
+        jtag_regions: [{'name':..., 'addr':..., 'size':...}] memory regions dumped over JTAG
+        jtag_speeds: adapter clocks (kHz) tried during speed negotiation
         """
         self.t = transport
         self.db = db
         self.outdir = outdir
         os.makedirs(self.outdir, exist_ok=True)
         self.logs = []
+        self.jtag_regions = jtag_regions or []
+        self.jtag_speeds = jtag_speeds
+        self.jtag_retries = jtag_retries
 
     def _outpath(self, tag):
         ts = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
         return os.path.join(self.outdir, f"{tag}_{ts}.bin")
 
-    def run_dump(self):
+    def _dump_jtag_session(self, ocd, regions):
+        # negotiate once per session, halt the core for the whole dump, resume even on failure
+        paths = []
+        ocd.halt()
+        try:
+            if ocd.speed_khz is None:
+                # negotiate on a halted core so the probe reads can't race running code
+                khz = ocd.negotiate_speed(regions[0]['addr'] & ~3, speeds=self.jtag_speeds)
+                self.logs.append(f"JTAG adapter speed {khz} kHz")
+            for r in regions:
+                p = self._outpath(f"jtag_{r.get('name', hex(r['addr']))}")
+                try:
+                    with open(p, 'wb') as fh:
+                        ocd.read_region(fh, r['addr'], r['size'], retries=self.jtag_retries)
+                except Exception as e:
+                    self.logs.append(f"JTAG region {r.get('name', hex(r['addr']))} failed: {e}")
+                    continue
+                paths.append(p)
+                if self.db: self.db.log_dump(p)
+        finally:
+            ocd.resume()
+        return paths
+
+    def tune_spi(self, target_id=None, retune=False):
+        """
+        Fastest reliable SPI clock/mode for the dump bus (see tuning.LinkTuner), or None when the
+        transport can't check link settings. Results are cached per target in the DB and only
+        re-verified on later runs; a cached setting that no longer passes triggers a full sweep.
+        """
+        if not hasattr(self.t, 'spi_check'):
+            return None
+        tuner = LinkTuner(self.t, freqs=getattr(self.t, 'spi_freqs', None))
+        cached = self.db.get_link_tuning(target_id, 'spi') if self.db and target_id and not retune else None
+        if cached and tuner.verify(cached):
+            self.logs.append(f"SPI link {cached['freq']} Hz mode {cached['mode']} (cached)")
+            return cached
+        tuning = tuner.tune()
+        self.logs.append(f"SPI link tuned to {tuning['freq']} Hz mode {tuning['mode']} (max {tuning['max_freq']} Hz)")
+        if self.db and target_id:
+            self.db.save_link_tuning(target_id, 'spi', tuning)
+        return tuning
+
+    def _dump_spi_tuned(self, target_id):
+        try:
+            tuning = self.tune_spi(target_id)
+        except Exception as e:
+            self.logs.append(f"SPI tuning failed: {e}")
+            tuning = None
+        if not tuning:
+            return self.t.dump_spi()
+        p = self.t.dump_spi(ladder=tuning['ladder'])
+        used = getattr(self.t, 'spi_setting', None)
+        if used and list(used) != tuning['ladder'][0]:
+            # the dump had to back off: start from the slower setting next time
+            i = tuning['ladder'].index(list(used))
+            tuning = dict(tuning, freq=used[0], mode=used[1], ladder=tuning['ladder'][i:])
+            self.logs.append(f"SPI dump backed off to {used[0]} Hz")
+            if self.db and target_id:
+                self.db.save_link_tuning(target_id, 'spi', tuning)
+        return p
+
+    def run_dump(self, jtag_regions=None, target_id=None):
+        """target_id keys the cached SPI link tuning."""
         dumps = []
         # Transport may provide a list of candidate interfaces to dump
         # We'll try SPI first, then I2C, UART, JTAG
         try:
             if hasattr(self.t, 'dump_spi'):
-                p = self.t.dump_spi()
+                p = self._dump_spi_tuned(target_id)
                 if p:
                     dumps.append(p)
                     if self.db: self.db.log_dump(p)
@@ -49,7 +119,11 @@ class FirmFlasher:
         except Exception as e:
             self.logs.append(f"UART dump failed: {e}")
         try:
-            if hasattr(self.t, 'dump_jtag'):
+            regions = jtag_regions or self.jtag_regions
+            ocd = self.t.jtag_session() if hasattr(self.t, 'jtag_session') and regions else None
+            if ocd:
+                dumps.extend(self._dump_jtag_session(ocd, regions))
+            elif hasattr(self.t, 'dump_jtag'):
                 p = self.t.dump_jtag()
                 if p:
                     dumps.append(p)
@@ -0,0 +1,214 @@
+"""
+Resident OpenOCD session driven over its TCL RPC socket.
+
+One OpenOCD process is started (or an already running one attached to) and kept for the
+whole dump; every command is a line on the socket terminated by 0x1a, and memory comes back
+in large read_memory blocks instead of one process launch per read.
+"""
+import socket
+import struct
+import subprocess
+import time
+
+TCL_TERMINATOR = b'\x1a'
+DEFAULT_SPEEDS_KHZ = [25000, 15000, 10000, 6000, 4000, 2000, 1000, 500, 100]
+
+class OpenOCDSession:
+    def __init__(self, configs=None, commands=None, host='127.0.0.1', port=6666, spawn=True,
+                 openocd='openocd', timeout=10.0):
+        """
+        configs: OpenOCD -f config files (interface + target)
+        commands: extra -c commands run at startup
+        spawn=False attaches to a server that is already listening on host:port (an OpenOCD
+        started by hand, or a stand-in TCL server in tests)
+        """
+        self.configs = configs or []
+        self.commands = commands or []
+        self.host = host
+        self.port = port
+        self.spawn = spawn
+        self.openocd = openocd
+        self.timeout = timeout
+        self.proc = None
+        self.sock = None
+        self.speed_khz = None
+        self._rbuf = bytearray()
+        self._has_read_memory = None   # False once the server lacks read_memory
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self.sock:
+            return self
+        if self.spawn:
+            args = [self.openocd, '-c', f'tcl_port {self.port}', '-c', 'gdb_port disabled', '-c', 'telnet_port disabled']
+            for cfg in self.configs:
+                args += ['-f', cfg]
+            for c in self.commands:
+                args += ['-c', c]
+            args += ['-c', 'init']
+            self.proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._connect()
+        return self
+
+    def _connect(self):
+        t0 = time.time()
+        while True:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                break
+            except OSError:
+                if self.proc and self.proc.poll() is not None:
+                    raise RuntimeError(f"openocd exited with code {self.proc.returncode}")
+                if time.time() - t0 > self.timeout:
+                    self.close()
+                    raise RuntimeError(f"no OpenOCD TCL server on {self.host}:{self.port}")
+                time.sleep(0.1)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _reconnect(self):
+        # a reply we gave up on would otherwise be taken as the answer to the next command
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+        self.sock = None
+        self._rbuf = bytearray()
+        self._connect()
+
+    def close(self):
+        if self.sock:
+            try:
+                if self.proc:
+                    self._rpc('shutdown')
+            except Exception:
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.proc:
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+            self.proc = None
+
+    def _rpc(self, line, timeout=None):
+        # raw round trip: one command out, everything up to the next 0x1a back
+        try:
+            self.sock.settimeout(timeout or self.timeout)
+            self.sock.sendall(line.encode() + TCL_TERMINATOR)
+            start = 0
+            while True:
+                end = self._rbuf.find(TCL_TERMINATOR, start)
+                if end >= 0:
+                    break
+                start = len(self._rbuf)
+                chunk = self.sock.recv(1 << 16)
+                if not chunk:
+                    raise OSError("OpenOCD closed the TCL connection")
+                self._rbuf += chunk
+        except OSError as e:
+            # socket.timeout included: start over on a fresh connection, then let callers retry
+            self._reconnect()
+            raise RuntimeError(f"OpenOCD TCL: {e or 'timed out'}")
+        reply = self._rbuf[:end].decode(errors='replace')
+        del self._rbuf[:end + 1]
+        return reply
+
+    def cmd(self, line, timeout=None):
+        """Run one OpenOCD/Jim command and return its result; raises RuntimeError if it failed."""
+        rc = self._rpc(f'catch {{{line}}} __hardpwn_res', timeout)
+        res = self._rpc('set __hardpwn_res')
+        if rc.strip() not in ('0', '2'):
+            raise RuntimeError(f"openocd: {line}: {res.strip()}")
+        return res
+
+    def set_speed(self, khz):
+        try:
+            self.cmd(f'adapter speed {khz}')
+        except RuntimeError:
+            self.cmd(f'adapter_khz {khz}')   # OpenOCD < 0.11
+        self.speed_khz = khz
+
+    def halt(self):
+        self.cmd('halt')
+
+    def resume(self):
+        self.cmd('resume')
+
+    def _xfer_timeout(self, size):
+        # ~4x the raw shift time of size bytes at the current adapter clock, on top of the base
+        khz = self.speed_khz or DEFAULT_SPEEDS_KHZ[-1]
+        return self.timeout + size * 8 * 4 / (khz * 1000.0)
+
+    def read_memory(self, addr, size):
+        """size bytes from addr (both word aligned) in one bulk transfer."""
+        count = size // 4
+        timeout = self._xfer_timeout(size)
+        if self._has_read_memory is not False:
+            try:
+                words = self.cmd(f'read_memory {addr:#x} 32 {count}', timeout).split()
+                return struct.pack(f'<{len(words)}I', *(int(w, 16) for w in words))
+            except RuntimeError as e:
+                if 'invalid command name' not in str(e):
+                    raise
+                self._has_read_memory = False
+        # older OpenOCD: parse "0xADDR: w0 w1 ..." lines from mdw
+        out = self.cmd(f'mdw {addr:#x} {count}', timeout)
+        words = []
+        for ln in out.splitlines():
+            if ':' in ln:
+                words += [int(w, 16) for w in ln.split(':', 1)[1].split()]
+        return struct.pack(f'<{len(words)}I', *words)
+
+    def negotiate_speed(self, probe_addr, probe_len=1024, speeds=None):
+        """
+        Highest adapter clock that reads probe_addr identically to a reference read taken at
+        the slowest candidate. Leaves the adapter at that speed and returns it (kHz).
+        """
+        speeds = sorted(speeds or DEFAULT_SPEEDS_KHZ, reverse=True)
+        self.set_speed(speeds[-1])
+        ref = self.read_memory(probe_addr, probe_len)
+        for khz in speeds:
+            try:
+                self.set_speed(khz)
+                if self.read_memory(probe_addr, probe_len) == ref and self.read_memory(probe_addr, probe_len) == ref:
+                    return khz
+            except RuntimeError:
+                continue
+        self.set_speed(speeds[-1])
+        return speeds[-1]
+
+    def read_region(self, fh, addr, size, block=64*1024, retries=3):
+        """
+        Stream addr..addr+size into fh in block-sized reads, retrying each block. Unaligned
+        ends are read as whole words and trimmed.
+        """
+        start = addr & ~3
+        skip = addr - start
+        end = (addr + size + 3) & ~3
+        block &= ~3
+        left = size
+        pos = start
+        while pos < end:
+            n = min(block, end - pos)
+            for attempt in range(retries + 1):
+                try:
+                    data = self.read_memory(pos, n)
+                    if len(data) == n:
+                        break
+                except RuntimeError:
+                    if attempt == retries:
+                        raise
+            else:
+                raise RuntimeError(f"short read at {pos:#x}")
+            data = data[skip:skip + left]
+            fh.write(data)
+            left -= len(data)
+            skip = 0
+            pos += n
+        return size
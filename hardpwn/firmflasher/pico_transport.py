@@ -2,13 +2,21 @@
 Host-side Pico flasher that instructs Pico firmware to read SPI/I2C/JTAG and return data.
 The Pico microcontroller performs the low-level reads and streams data back; host writes binary file.
 """
-import serial, time, json, binascii, os
+import serial, time, json, binascii, os, io
+from .bootloaders import dump_uart_bootloader
+from .tuning import dump_verified
 
 class PicoFlasherTransport:
-    def __init__(self, port, db=None, baud=115200, timeout=5.0):
+    def __init__(self, port, db=None, baud=115200, timeout=5.0, uart_boot=None):
+        """
+        uart_boot: {'port':..., 'protocol': 'stm32'|'esp', 'regions': [...]} for ROM bootloader
+                   dumps; the target UART is reached through a host serial adapter, not the Pico.
+        """
         self.ser = serial.Serial(port, baud, timeout=timeout)
         time.sleep(1.0)
         self.db = db
+        self.uart_boot = uart_boot
+        self.spi_setting = None
 
     def _cmd(self, cmd, timeout=5.0):
         self.ser.reset_input_buffer()
@@ -26,33 +34,80 @@ class PicoFlasherTransport:
         except Exception:
             return {'_raw': line}
 
-    def run_streamed_dump(self, cmd, outpath):
+    def _stream_into(self, cmd, fh):
         # Instruct pico to start dump; Pico will first send JSON status {"size":N}
+        # Returns (received, size), or None when the Pico did not start the dump.
         self.ser.reset_input_buffer()
         self.ser.write((cmd.strip()+"\n").encode())
         header = self.ser.readline().decode().strip()
         try:
             meta = json.loads(header)
-            size = int(meta.get('size',0))
+            size = int(meta['size'])
         except Exception:
             return None
+        remaining = size
+        while remaining > 0:
+            chunk = self.ser.read(min(64*1024, remaining))
+            if not chunk:
+                break
+            fh.write(chunk)
+            remaining -= len(chunk)
+        return size - remaining, size
+
+    def run_streamed_dump(self, cmd, outpath):
         os.makedirs(os.path.dirname(outpath), exist_ok=True)
         with open(outpath, "wb") as fh:
-            remaining = size
-            while remaining > 0:
-                chunk = self.ser.read(min(4096, remaining))
-                if not chunk:
-                    break
-                fh.write(chunk)
-                remaining -= len(chunk)
+            got = self._stream_into(cmd, fh)
+        if got is None:
+            os.remove(outpath)
+            return None
+        if got[0] != got[1]:
+            # the Pico ends a stalled dump early; a truncated image is not a dump
+            os.remove(outpath)
+            raise RuntimeError(f"{cmd.split()[0]} stopped after {got[0]} of {got[1]} bytes")
         if self.db: self.db.log_dump(outpath)
         return outpath
 
-    def dump_spi(self, outpath="results/dumps/pico_spi.bin"):
-        return self.run_streamed_dump("SPI_DUMP", outpath)
+    def spi_check(self, addr, length, freq_hz, mode):
+        """(jedec_hex, sfdp_hex, crc32) read by the Pico at one clock/mode; see tuning.LinkTuner."""
+        j = self._cmd(f"SPI_CHECK {addr} {length} {freq_hz} {mode}", timeout=5.0)
+        if 'crc' not in j:
+            raise RuntimeError(f"SPI_CHECK failed: {j.get('error', j)}")
+        return j['jedec'], j['sfdp'], j['crc']
+
+    def spi_read(self, addr, length, freq_hz, mode):
+        buf = io.BytesIO()
+        self._stream_into(f"SPI_DUMP {length} {freq_hz} {addr} {mode}", buf)
+        return buf.getvalue()
+
+    def dump_spi(self, outpath="results/dumps/pico_spi.bin", size=1024*1024, freq_hz=10000000, addr=0, mode=0, ladder=None):
+        """
+        Without a ladder the Pico does one continuous FAST_READ of `size` bytes at `freq_hz`
+        and streams it back. With a ladder ([[freq, mode], ...] from LinkTuner) every 64 KiB
+        block is checked against a CRC the Pico computes from its own read, backing off the
+        clock on mismatch; the setting in use at the end is left in self.spi_setting.
+        """
+        if not ladder:
+            self.spi_setting = [freq_hz, mode]
+            return self.run_streamed_dump(f"SPI_DUMP {size} {freq_hz} {addr} {mode}", outpath)
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+        with open(outpath, "wb") as fh:
+            self.spi_setting = dump_verified(fh, addr, size, self.spi_read,
+                                             lambda a, n, f, m: self.spi_check(a, n, f, m)[2], ladder)
+        if self.db: self.db.log_dump(outpath)
+        return outpath
 
     def dump_i2c(self, outpath="results/dumps/pico_i2c.bin"):
         return self.run_streamed_dump("I2C_DUMP", outpath)
 
+    def dump_uart(self, outpath=None):
+        if not self.uart_boot:
+            return None
+        protocol = self.uart_boot.get('protocol', 'stm32')
+        outpath = outpath or f"results/dumps/pico_uart_{protocol}.bin"
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+        return dump_uart_bootloader(self.uart_boot['port'], outpath, protocol=protocol,
+                                    regions=self.uart_boot.get('regions'), bauds=self.uart_boot.get('bauds'))
+
     def dump_jtag(self, outpath="results/dumps/pico_jtag.bin"):
         return self.run_streamed_dump("JTAG_DUMP", outpath)
@@ -4,6 +4,10 @@ WARNING: Generic read uses 0x03 (legacy) command. For many chips you will need 0
 with dummy cycles. For robust extraction use flashrom when possible.
 """
 import os
+import zlib
+from .openocd import OpenOCDSession
+from .bootloaders import dump_uart_bootloader
+from .tuning import dump_verified
 try:
     import spidev
 except Exception:
@@ -15,8 +19,17 @@ except Exception:
     smbus2 = None
 
 class PiGpioFlasherTransport:
-    def __init__(self, db=None):
+    def __init__(self, db=None, openocd_cfg=None, uart_boot=None):
+        """
+        openocd_cfg: OpenOCD config files (interface + target) enabling JTAG dumps.
+        uart_boot: {'port':..., 'protocol': 'stm32'|'esp', 'regions': [...]} enabling ROM
+                   bootloader dumps over a host serial port.
+        """
         self.db = db
+        self.openocd_cfg = openocd_cfg
+        self.uart_boot = uart_boot
+        self._ocd = None
+        self.spi_setting = None
         if spidev:
             self.spi = spidev.SpiDev()
             try:
@@ -27,17 +40,48 @@ class PiGpioFlasherTransport:
         else:
             self.spi = None
 
-    def dump_spi(self, outpath=None, size=1024*1024, chunk=4096):
-        outpath = outpath or "results/dumps/spi_flash.bin"
-        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+    def _spi_at(self, freq_hz, mode):
         if not self.spi:
             raise RuntimeError("spidev not available")
+        if self.spi.max_speed_hz != freq_hz:
+            self.spi.max_speed_hz = freq_hz
+        if self.spi.mode != mode:
+            self.spi.mode = mode
+        return self.spi
+
+    def spi_read(self, addr, length, freq_hz, mode, chunk=4092):
+        # chunk + 4 command bytes fits spidev's default 4096-byte transfer buffer
+        spi = self._spi_at(freq_hz, mode)
+        out = bytearray()
+        for a in range(addr, addr + length, chunk):
+            n = min(chunk, addr + length - a)
+            resp = spi.xfer2([0x03, (a>>16)&0xFF, (a>>8)&0xFF, a&0xFF] + [0]*n)
+            out += bytes(resp[4:])
+        return bytes(out)
+
+    def spi_check(self, addr, length, freq_hz, mode):
+        """(jedec_hex, sfdp_hex, crc32) at one clock/mode; see tuning.LinkTuner."""
+        spi = self._spi_at(freq_hz, mode)
+        jedec = bytes(spi.xfer2([0x9F, 0, 0, 0])[1:]).hex()
+        sfdp = bytes(spi.xfer2([0x5A, 0, 0, 0, 0] + [0]*16)[5:]).hex()
+        return jedec, sfdp, zlib.crc32(self.spi_read(addr, length, freq_hz, mode))
+
+    def dump_spi(self, outpath=None, size=1024*1024, freq_hz=2000000, mode=0, ladder=None):
+        """
+        Without a ladder this is a plain read at freq_hz. With a ladder ([[freq, mode], ...]
+        from LinkTuner) every 64 KiB block is read twice and compared, backing off the clock
+        on mismatch; the setting in use at the end is left in self.spi_setting.
+        """
+        outpath = outpath or "results/dumps/spi_flash.bin"
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
         with open(outpath, "wb") as fh:
-            for addr in range(0, size, chunk):
-                # send 0x03 + 3-byte addr then read chunk
-                cmd = [0x03, (addr>>16)&0xFF, (addr>>8)&0xFF, addr&0xFF] + [0]*min(chunk, size-addr)
-                resp = bytes(self.spi.xfer2(cmd))
-                fh.write(resp[-min(chunk,size-addr):])
+            if ladder:
+                self.spi_setting = dump_verified(fh, 0, size, self.spi_read,
+                                                 lambda a, n, f, m: zlib.crc32(self.spi_read(a, n, f, m)), ladder)
+            else:
+                for addr in range(0, size, 64*1024):
+                    fh.write(self.spi_read(addr, min(64*1024, size - addr), freq_hz, mode))
+                self.spi_setting = [freq_hz, mode]
         if self.db: self.db.log_dump(outpath)
         return outpath
 
@@ -62,10 +106,23 @@ class PiGpioFlasherTransport:
         return outpath
 
     def dump_uart(self, outpath=None):
-        # Bootloader specific implementations needed for real devices (STM32/stlink, esp)
-        # This placeholder returns no data
-        return None
+        if not self.uart_boot:
+            return None
+        protocol = self.uart_boot.get('protocol', 'stm32')
+        outpath = outpath or f"results/dumps/uart_{protocol}.bin"
+        os.makedirs(os.path.dirname(outpath), exist_ok=True)
+        return dump_uart_bootloader(self.uart_boot['port'], outpath, protocol=protocol,
+                                    regions=self.uart_boot.get('regions'), bauds=self.uart_boot.get('bauds'))
+
+    def jtag_session(self):
+        """Resident OpenOCD session (started on first use), or None when JTAG isn't configured."""
+        if not self.openocd_cfg:
+            return None
+        if self._ocd is None:
+            self._ocd = OpenOCDSession(configs=self.openocd_cfg).start()
+        return self._ocd
 
-    def dump_jtag(self, outpath=None, size=64*1024, chunk=256):
-        # JTAG memory reading is adapter-specific (openocd). Implement as needed.
-        return None
+    def close(self):
+        if self._ocd:
+            self._ocd.close()
+            self._ocd = None
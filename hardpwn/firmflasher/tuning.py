@@ -0,0 +1,109 @@
+"""
+SPI link tuning: find the fastest clock/mode a target's flash reads back reliably.
+
+A transport opts in by implementing
+  spi_check(addr, length, freq_hz, mode) -> (jedec_hex, sfdp_hex, crc32)
+which reads the JEDEC ID, the SFDP header and a CRC of a sample block at one setting.
+References are taken at the slowest clock; every faster setting has to reproduce them on
+repeated checks. The chosen setting sits a safety margin below the fastest one that passed,
+and the passing settings below it form the back-off ladder used by dump_verified.
+"""
+import zlib
+
+SPI_FREQS = [500000, 1000000, 2000000, 4000000, 8000000, 10000000, 16000000, 20000000,
+             25000000, 31250000, 40000000, 50000000, 62500000]
+SPI_MODES = (0, 3)
+
+class LinkTuner:
+    def __init__(self, link, freqs=None, modes=SPI_MODES, repeats=3, sample_addr=0, sample_len=4096, margin=1):
+        """
+        link: transport implementing spi_check()
+        repeats: checks per setting; a single mismatch fails the setting
+        margin: steps kept below the fastest passing clock
+        """
+        self.link = link
+        self.freqs = sorted(freqs or SPI_FREQS)
+        self.modes = modes
+        self.repeats = repeats
+        self.sample = (sample_addr, sample_len)
+        self.margin = margin
+        self.ref = None
+
+    def _check(self, freq, mode):
+        jedec, sfdp, crc = self.link.spi_check(self.sample[0], self.sample[1], freq, mode)
+        return jedec, sfdp, crc & 0xFFFFFFFF
+
+    def reference(self):
+        """JEDEC/SFDP/CRC at the slowest clock in mode 0; two reads must agree."""
+        a = self._check(self.freqs[0], 0)
+        b = self._check(self.freqs[0], 0)
+        if a != b:
+            raise RuntimeError("SPI reads disagree even at the slowest clock")
+        if a[0] in ('000000', 'ffffff', ''):
+            raise RuntimeError("no SPI flash answering (JEDEC %s)" % (a[0] or 'empty'))
+        self.ref = a
+        return a
+
+    def passes(self, freq, mode):
+        if self.ref is None:
+            self.reference()
+        for _ in range(self.repeats):
+            try:
+                if self._check(freq, mode) != self.ref:
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def tune(self):
+        """
+        {'freq', 'mode', 'max_freq', 'ladder': [[freq, mode], ...]} where ladder runs from the
+        chosen setting down to the slowest one and is what dumps back off along.
+        """
+        self.reference()
+        best = None
+        for mode in self.modes:
+            ok = []
+            for f in self.freqs:
+                # errors only get worse with clock, so stop at the first failure
+                if not self.passes(f, mode):
+                    break
+                ok.append(f)
+            if ok and (best is None or len(ok) > len(best[1])):
+                best = (mode, ok)
+        if best is None:
+            raise RuntimeError("no SPI clock/mode setting passed")
+        mode, ok = best
+        chosen = max(0, len(ok) - 1 - self.margin)
+        return {'freq': ok[chosen], 'mode': mode, 'max_freq': ok[-1], 'jedec': self.ref[0],
+                'ladder': [[f, mode] for f in reversed(ok[:chosen + 1])]}
+
+    def verify(self, tuning):
+        """Re-check a cached tuning result against fresh references."""
+        try:
+            return self.passes(tuning['freq'], tuning['mode']) and self.ref[0] == tuning.get('jedec', self.ref[0])
+        except Exception:
+            return False
+
+def dump_verified(fh, addr, size, read, crc, ladder, block=64*1024, log=None):
+    """
+    Copy size bytes from addr into fh block by block. read(addr, n, freq, mode) returns the
+    data; crc(addr, n, freq, mode) an independently read CRC32 of the same block. A mismatch
+    retries the block one step down the ladder. Returns the [freq, mode] in use at the end.
+    """
+    step = 0
+    done = 0
+    while done < size:
+        n = min(block, size - done)
+        freq, mode = ladder[step]
+        data = read(addr + done, n, freq, mode)
+        if len(data) == n and zlib.crc32(data) == crc(addr + done, n, freq, mode) & 0xFFFFFFFF:
+            fh.write(data)
+            done += n
+            continue
+        if step + 1 >= len(ladder):
+            raise RuntimeError(f"SPI block 0x{addr + done:x} fails CRC even at {freq} Hz")
+        step += 1
+        if log:
+            log(f"SPI CRC mismatch at 0x{addr + done:x}, backing off to {ladder[step][0]} Hz")
+    return ladder[step]
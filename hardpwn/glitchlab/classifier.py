@@ -0,0 +1,157 @@
+"""
+Online classification of glitch attempts and per-cell outcome counters.
+
+Every transport reply is mapped to one of OUTCOMES as the attempt completes, and the
+(kind, pulse width, delay) cell it belongs to is updated in place, so a live heatmap or a
+campaign stopping rule never has to re-read the DB.
+"""
+import hashlib
+import re
+
+OUTCOMES = ('normal', 'mute', 'reset', 'crash', 'anomaly', 'success', 'error')
+NORMAL, MUTE, RESET, CRASH, ANOMALY, SUCCESS, ERROR = range(len(OUTCOMES))
+
+DEFAULT_RESET_PATTERNS = [r'(?i)\bboot(ing|rom|loader)?\b', r'(?i)\breset\b', r'rst:0x']
+DEFAULT_CRASH_PATTERNS = [r'(?i)hard ?fault', r'(?i)\bpanic', r'(?i)exception', r'Guru Meditation', r'(?i)\babort']
+
+def reply_error(reply):
+    """True when the glitch itself failed (transport/link error), as opposed to a quiet target."""
+    return isinstance(reply, dict) and (reply.get('status') == 'error' or 'error' in reply)
+
+def reply_output(reply):
+    """Target output carried in a transport reply ('' when there is none)."""
+    if not isinstance(reply, dict):
+        return '' if reply is None else str(reply)
+    for key in ('output', 'uart', 'data', '_raw'):
+        v = reply.get(key)
+        if v:
+            return v.decode(errors='replace') if isinstance(v, (bytes, bytearray)) else str(v)
+    return ''
+
+class OutcomeClassifier:
+    def __init__(self, golden=None, matchers=None, reset_patterns=None, crash_patterns=None,
+                 learn_golden=True, normalize=None):
+        """
+        golden: known-good target outputs; attempts whose output hashes the same are 'normal'
+        matchers: [(outcome, regex or callable(output) -> bool)] checked before anything else,
+                  e.g. [('success', r'flag\\{')]
+        learn_golden: with no golden given, the first output that matches no crash pattern
+                      becomes the golden one; reset patterns don't block it, since targets
+                      glitched across a reset print a boot banner in their normal output
+        Crash/reset patterns only apply to outputs that differ from the golden ones.
+        normalize: optional callable applied to output before hashing (strip counters, times)
+        """
+        self.normalize = normalize or (lambda s: s.strip())
+        self.golden = set()
+        self.learn_golden = learn_golden
+        for g in golden or []:
+            self.add_golden(g)
+        self.matchers = [(OUTCOMES.index(o), self._compile(m)) for o, m in (matchers or [])]
+        self.reset_res = [re.compile(p) for p in (DEFAULT_RESET_PATTERNS if reset_patterns is None else reset_patterns)]
+        self.crash_res = [re.compile(p) for p in (DEFAULT_CRASH_PATTERNS if crash_patterns is None else crash_patterns)]
+
+    @staticmethod
+    def _compile(m):
+        if callable(m):
+            return m
+        rx = re.compile(m)
+        return lambda out: rx.search(out) is not None
+
+    def _hash(self, output):
+        return hashlib.blake2b(self.normalize(output).encode(errors='replace'), digest_size=8).digest()
+
+    def add_golden(self, output):
+        if isinstance(output, (bytes, bytearray)):
+            output = output.decode(errors='replace')
+        self.golden.add(self._hash(output))
+
+    def state(self):
+        """Learned golden hashes, for checkpointing a campaign."""
+        return {'golden': sorted(h.hex() for h in self.golden)}
+
+    def load_state(self, state):
+        self.golden = {bytes.fromhex(h) for h in state.get('golden', [])}
+
+    def classify(self, reply):
+        """Outcome index (see OUTCOMES) for one transport reply."""
+        if reply_error(reply):
+            return ERROR
+        out = reply_output(reply)
+        for outcome, match in self.matchers:
+            if match(out):
+                return outcome
+        if not out:
+            return MUTE
+        h = self._hash(out)
+        if h in self.golden:
+            return NORMAL
+        if any(rx.search(out) for rx in self.crash_res):
+            return CRASH
+        if not self.golden and self.learn_golden:
+            self.golden.add(h)
+            return NORMAL
+        if any(rx.search(out) for rx in self.reset_res):
+            return RESET
+        return ANOMALY
+
+class CampaignStats:
+    """Streaming per-cell counters keyed by (kind, pw_ns, delay_ns); O(1) per attempt."""
+    def __init__(self):
+        # cell -> [attempts, count per outcome...]
+        self.cells = {}
+        self.totals = [0] * (1 + len(OUTCOMES))
+
+    def record(self, kind, pw, delay, outcome):
+        key = (kind, pw, delay)
+        c = self.cells.get(key)
+        if c is None:
+            c = self.cells[key] = [0] * (1 + len(OUTCOMES))
+        c[0] += 1
+        c[1 + outcome] += 1
+        self.totals[0] += 1
+        self.totals[1 + outcome] += 1
+
+    def state(self):
+        """JSON-friendly copy of every cell, for checkpointing a campaign."""
+        return [[k[0], k[1], k[2], c[:]] for k, c in list(self.cells.items())]
+
+    def load_state(self, cells):
+        self.cells = {}
+        self.totals = [0] * (1 + len(OUTCOMES))
+        for kind, pw, delay, c in cells:
+            # checkpoints written before an outcome was added are shorter
+            c = list(c) + [0] * (1 + len(OUTCOMES) - len(c))
+            self.cells[(kind, pw, delay)] = c
+            for i, v in enumerate(c):
+                self.totals[i] += v
+
+    def count(self, kind, pw, delay, outcome=None):
+        c = self.cells.get((kind, pw, delay))
+        if c is None:
+            return 0
+        return c[0] if outcome is None else c[1 + outcome]
+
+    def rate(self, kind, pw, delay, outcome):
+        c = self.cells.get((kind, pw, delay))
+        return c[1 + outcome] / c[0] if c and c[0] else 0.0
+
+    def summary(self):
+        return {'attempts': self.totals[0], **{o: self.totals[1 + i] for i, o in enumerate(OUTCOMES)}}
+
+    def snapshot(self, outcome=SUCCESS, kind=None):
+        """
+        Heatmap of one outcome's rate: {'pws': [...], 'delays': [...], 'rate': [[...]], 'n': [[...]]}
+        with rows per pulse width and columns per delay. Cells never tried have n == 0.
+        """
+        cells = [(k, c[:]) for k, c in list(self.cells.items()) if kind is None or k[0] == kind]
+        pws = sorted({k[1] for k, _ in cells})
+        delays = sorted({k[2] for k, _ in cells})
+        n = [[0] * len(delays) for _ in pws]
+        hits = [[0] * len(delays) for _ in pws]
+        pi = {p: i for i, p in enumerate(pws)}
+        di = {d: i for i, d in enumerate(delays)}
+        for (_, pw, d), c in cells:
+            n[pi[pw]][di[d]] += c[0]
+            hits[pi[pw]][di[d]] += c[1 + outcome]
+        rate = [[h / m if m else 0.0 for h, m in zip(hr, nr)] for hr, nr in zip(hits, n)]
+        return {'outcome': OUTCOMES[outcome], 'pws': pws, 'delays': delays, 'rate': rate, 'n': n}
@@ -0,0 +1,36 @@
+"""
+Target console capture for glitch transports: a host serial port wired to the target's UART.
+Whatever the target prints in a short window after each glitch goes into the reply as
+'output', which is what OutcomeClassifier looks at.
+"""
+import time
+
+class TargetConsole:
+    def __init__(self, port, baud=115200, window=0.2):
+        """window: seconds to listen after each glitch"""
+        import serial
+        self.ser = serial.Serial(port, baud, timeout=0.02)
+        self.window = window
+
+    def arm(self):
+        # drop whatever the target printed before this attempt
+        self.ser.reset_input_buffer()
+
+    def collect(self):
+        out = bytearray()
+        t0 = time.time()
+        while time.time() - t0 < self.window:
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+            if chunk:
+                out += chunk
+        return out.decode(errors='replace')
+
+    def close(self):
+        self.ser.close()
+
+def open_console(spec):
+    """'PORT[:BAUD]' (e.g. /dev/ttyUSB1:115200) -> TargetConsole, or None for an empty spec."""
+    if not spec:
+        return None
+    port, _, baud = spec.partition(':')
+    return TargetConsole(port, int(baud) if baud else 115200)
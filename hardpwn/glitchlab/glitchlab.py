@@ -1,29 +1,139 @@
-import datetime
+import random
+import time
+from .classifier import OutcomeClassifier, CampaignStats, OUTCOMES, NORMAL, SUCCESS
+from .results import Attempt, AttemptRing, CampaignResult, SpillFile
 
 class GlitchLab:
-    def __init__(self, transport, db=None):
+    def __init__(self, transport, db=None, classifier=None, keep_recent=65536, spill_path=None, commit_every=1.0):
         """
         transport: object implementing glitch_voltage(pulse_ns, delay_ns),
                    glitch_clock(...), glitch_reset(...)
+        classifier: OutcomeClassifier used to label each attempt (default: learns the golden
+                    output from the first reply)
+        keep_recent: attempts kept in memory (compact ring); older ones live only in the DB
+        spill_path: JSON-lines file for raw replies when there is no DB
+        commit_every: seconds between DB commits (and campaign checkpoints) during a campaign
+        self.stats holds live per-cell counters (see CampaignStats.snapshot for a heatmap).
         """
         self.t = transport
         self.db = db
+        self.classifier = classifier or OutcomeClassifier()
+        self.stats = CampaignStats()
+        self.keep_recent = keep_recent
+        self.spill_path = spill_path
+        self.commit_every = commit_every
+        self.campaign_id = None
 
-    def run_campaigns(self, campaigns=None):
+    def run_campaigns(self, campaigns=None, campaign_id=None, seed=None):
+        """
+        Run campaigns to completion and return a CampaignResult (summary counters plus the
+        most recent attempts). Use iter_campaigns to handle attempts one by one.
+        """
+        recent = AttemptRing(self.keep_recent)
+        for a in self.iter_campaigns(campaigns, campaign_id=campaign_id, seed=seed):
+            recent.append(a)
+        return CampaignResult(self.stats, recent, self.spill_path)
+
+    def resume(self, campaign_id=None):
+        """Continue a stored campaign (default: the latest unfinished one) where it stopped."""
+        stored = self.db.get_campaign(campaign_id) if self.db else None
+        if stored is None:
+            raise RuntimeError("no campaign to resume")
+        return self.run_campaigns(campaign_id=stored['id'])
+
+    @staticmethod
+    def _cells(c, ci, seed):
+        cells = [(pw, d) for pw in c.get('pulse_widths', [50]) for d in c.get('delays', [0])]
+        if seed is not None:
+            random.Random(seed * 1000003 + ci).shuffle(cells)
+        return cells
+
+    def iter_campaigns(self, campaigns=None, campaign_id=None, seed=None):
+        """
+        Yield one Attempt per glitch as it completes; raw replies are written to the DB (or the
+        spill file) and dropped from memory once the caller moves on.
+        Campaign dicts take kind, pulse_widths, delays and repeats, plus optional:
+          stop_after_successes: end the whole run once this many successes were seen
+          cell_probe: leave a cell after this many attempts if every one of them was 'normal'
+        seed shuffles the order cells are visited in (repeatably).
+
+        With a DB the run is stored as a campaign (self.campaign_id): every planned attempt has
+        a fixed sequence number, and the cursor, counters and learned golden outputs are saved
+        in the same commit as the glitch rows. Passing campaign_id resumes a stored campaign
+        from its cursor with that state restored (the stored spec and seed are used).
+        """
+        cursor = 0
+        successes0 = self.stats.totals[1 + SUCCESS]
+        if campaign_id is not None:
+            if not self.db:
+                raise RuntimeError("resuming a campaign needs a DB")
+            stored = self.db.get_campaign(campaign_id)
+            if stored is None:
+                raise RuntimeError(f"no campaign {campaign_id}")
+            campaigns, seed, cursor = stored['spec'], stored['seed'], stored['cursor']
+            if stored['state']:
+                self.stats.load_state(stored['state']['stats'])
+                self.classifier.load_state(stored['state']['classifier'])
+                successes0 = stored['state']['successes0']
+            if stored['status'] == 'done':
+                # nothing left to run; the restored counters still describe the campaign
+                self.campaign_id = stored['id']
+                return
+            campaign_id = stored['id']
         if campaigns is None:
             campaigns = [{'kind':'voltage','pulse_widths':[50,100,200],'delays':[0,50,100],'repeats':3}]
-        results = []
-        for c in campaigns:
-            kind = c.get('kind','voltage')
-            for pw in c.get('pulse_widths', [50]):
-                for d in c.get('delays',[0]):
-                    for r in range(0, c.get('repeats',1)):
+        if self.db and campaign_id is None:
+            campaign_id = self.db.create_campaign(campaigns, seed)
+        self.campaign_id = campaign_id
+        spill = SpillFile(self.spill_path) if self.spill_path and not self.db else None
+        last_commit = time.time()
+        status = None
+
+        def checkpoint():
+            if campaign_id is not None:
+                state = {'stats': self.stats.state(), 'classifier': self.classifier.state(), 'successes0': successes0}
+                self.db.save_campaign(campaign_id, cursor, state, status, commit=False)
+            self.db.commit()
+
+        try:
+            seq = 0
+            for ci, c in enumerate(campaigns):
+                kind = c.get('kind','voltage')
+                stop_after = c.get('stop_after_successes')
+                probe = c.get('cell_probe')
+                repeats = c.get('repeats',1)
+                cells = self._cells(c, ci, seed)
+                for n, (pw, d) in enumerate(cells):
+                    base = seq + n * repeats
+                    if base + repeats <= cursor:
+                        continue
+                    for r in range(max(0, cursor - base), repeats):
+                        if probe and r >= probe and self.stats.count(kind, pw, d, NORMAL) == self.stats.count(kind, pw, d):
+                            break
                         res = self._single_attempt(kind, pw, d)
-                        entry = {'when': datetime.datetime.now().isoformat(), 'kind':kind, 'pw_ns':pw, 'delay_ns':d, 'iter':r, 'result':res}
-                        results.append(entry)
+                        outcome = self.classifier.classify(res)
+                        self.stats.record(kind, pw, d, outcome)
+                        a = Attempt(kind, pw, d, r, outcome, time.time(), res)
+                        cursor = base + r + 1
                         if self.db:
-                            self.db.log_glitch({'kind':kind,'pw_ns':pw,'delay_ns':d,'iter':r}, res)
-        return results
+                            self.db.log_glitch({'kind':kind,'pw_ns':pw,'delay_ns':d,'iter':r,'outcome':OUTCOMES[outcome]}, res,
+                                               commit=False, campaign_id=campaign_id, seq=base + r)
+                            if a.ts - last_commit >= self.commit_every:
+                                checkpoint()
+                                last_commit = a.ts
+                        elif spill:
+                            spill.write(a)
+                        yield a
+                        if stop_after and self.stats.totals[1 + SUCCESS] - successes0 >= stop_after:
+                            status = 'done'
+                            return
+                seq += len(cells) * repeats
+            status = 'done'
+        finally:
+            if self.db:
+                checkpoint()
+            if spill:
+                spill.close()
 
     def _single_attempt(self, kind, pw, delay):
         try:
@@ -1,14 +1,16 @@
 """
 Host-side Pico glitch transport: instructs Pico firmware to toggle pins for glitching.
 The Pico firmware must implement GLITCH_V, GLITCH_C, GLITCH_R commands.
+Pass console=TargetConsole(...) to add the target's UART output to every reply.
 """
 import serial, time, json
 
 class PicoGlitchTransport:
-    def __init__(self, port, db=None, baud=115200, timeout=2.0):
+    def __init__(self, port, db=None, baud=115200, timeout=2.0, console=None):
         self.ser = serial.Serial(port, baud, timeout=timeout)
         time.sleep(1.0)
         self.db = db
+        self.console = console
 
     def _cmd(self, line, timeout=2.0):
         self.ser.reset_input_buffer()
@@ -22,16 +24,25 @@ class PicoGlitchTransport:
                 return json.loads(l)
             except Exception:
                 return {'_raw':l}
-        return {}
+        return {'status':'error', 'error':'no reply from Pico'}
 
-    def glitch_voltage(self, pulse_ns, delay_ns):
-        r = self._cmd(f"GLITCH_V {pulse_ns} {delay_ns}", timeout=2.0)
+    def _glitch(self, line):
+        if self.console:
+            self.console.arm()
+        r = self._cmd(line, timeout=2.0)
+        if self.console and not r.get('error'):
+            r = dict(r, output=self.console.collect())
         return r
 
+    def glitch_voltage(self, pulse_ns, delay_ns):
+        return self._glitch(f"GLITCH_V {pulse_ns} {delay_ns}")
+
     def glitch_clock(self, pulse_ns, delay_ns):
-        r = self._cmd(f"GLITCH_C {pulse_ns} {delay_ns}", timeout=2.0)
-        return r
+        return self._glitch(f"GLITCH_C {pulse_ns} {delay_ns}")
 
     def glitch_reset(self, pulse_ns, delay_ns):
-        r = self._cmd(f"GLITCH_R {pulse_ns} {delay_ns}", timeout=2.0)
-        return r
+        return self._glitch(f"GLITCH_R {pulse_ns} {delay_ns}")
+
+    def close(self):
+        if self.console:
+            self.console.close()
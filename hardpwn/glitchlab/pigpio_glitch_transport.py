@@ -1,6 +1,7 @@
 """
 Pi-based simple glitcher using a GPIO to toggle a MOSFET or power switch.
 This is a hardware-dependent routine. You must wire the MOSFET gate to the chosen pin with proper level-shifting.
+Pass console=TargetConsole(...) to add the target's UART output to every reply.
 """
 import time
 try:
@@ -9,23 +10,31 @@ except Exception:
     GPIO = None
 
 class PiGpioGlitchTransport:
-    def __init__(self, db=None, power_pin=18):
+    def __init__(self, db=None, power_pin=18, console=None):
         self.db = db
         self.pin = power_pin
+        self.console = console
         if GPIO:
             GPIO.setmode(GPIO.BCM)
             GPIO.setup(self.pin, GPIO.OUT)
             GPIO.output(self.pin, GPIO.LOW)
 
+    def _with_console(self, reply):
+        if self.console:
+            reply['output'] = self.console.collect()
+        return reply
+
     def glitch_voltage(self, pulse_ns, delay_ns):
         if GPIO is None:
-            return {'status':'no_gpio'}
+            return {'status':'error', 'error':'RPi.GPIO not available'}
+        if self.console:
+            self.console.arm()
         time.sleep(delay_ns/1e9)
         # pulse MOSFET gate high for duration
         GPIO.output(self.pin, GPIO.HIGH)
         time.sleep(pulse_ns/1e9)
         GPIO.output(self.pin, GPIO.LOW)
-        return {'status':'ok'}
+        return self._with_console({'status':'ok'})
 
     def glitch_clock(self, pulse_ns, delay_ns):
         # Implement clock injection toggling an injected pin; placeholder
@@ -34,3 +43,7 @@ class PiGpioGlitchTransport:
     def glitch_reset(self, pulse_ns, delay_ns):
         # Implement reset pin pulse; placeholder
         return {'status':'ok_placeholder'}
+
+    def close(self):
+        if self.console:
+            self.console.close()
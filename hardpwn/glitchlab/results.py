@@ -0,0 +1,121 @@
+"""
+Compact result storage for long glitch campaigns.
+
+Attempts are kept in a fixed-size ring of array-backed columns (kind, pw, delay, iter,
+outcome, timestamp), so memory stays flat however long a campaign runs. Raw transport replies
+are not kept in memory; they go to the DB or to a JSON-lines spill file.
+"""
+from array import array
+import json
+
+from .classifier import OUTCOMES
+
+class Attempt:
+    __slots__ = ('kind', 'pw_ns', 'delay_ns', 'iter', 'outcome', 'ts', 'result')
+
+    def __init__(self, kind, pw_ns, delay_ns, it, outcome, ts, result=None):
+        self.kind = kind
+        self.pw_ns = pw_ns
+        self.delay_ns = delay_ns
+        self.iter = it
+        self.outcome = outcome
+        self.ts = ts
+        self.result = result
+
+    def as_dict(self):
+        d = {'ts': self.ts, 'kind': self.kind, 'pw_ns': self.pw_ns, 'delay_ns': self.delay_ns,
+             'iter': self.iter, 'outcome': OUTCOMES[self.outcome]}
+        if self.result is not None:
+            d['result'] = self.result
+        return d
+
+    def __repr__(self):
+        return f"Attempt({self.kind} pw={self.pw_ns} delay={self.delay_ns} iter={self.iter} {OUTCOMES[self.outcome]})"
+
+def _ns(v):
+    # whole-ns values come back as the ints they went in as
+    return int(v) if v.is_integer() else v
+
+class AttemptRing:
+    """The most recent `capacity` attempts, column-packed (~30 bytes per slot)."""
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.kinds = []
+        self.kind = array('B', bytes(capacity))
+        # float columns: campaign specs may use fractional ns (e.g. a 12.5 ns pulse)
+        self.pw = array('d', [0.0]) * capacity
+        self.delay = array('d', [0.0]) * capacity
+        self.iter = array('I', [0]) * capacity
+        self.outcome = array('B', bytes(capacity))
+        self.ts = array('d', [0.0]) * capacity
+        self.total = 0
+
+    def append(self, a):
+        try:
+            k = self.kinds.index(a.kind)
+        except ValueError:
+            self.kinds.append(a.kind)
+            k = len(self.kinds) - 1
+        i = self.total % self.capacity
+        self.kind[i] = k
+        self.pw[i] = a.pw_ns
+        self.delay[i] = a.delay_ns
+        self.iter[i] = a.iter
+        self.outcome[i] = a.outcome
+        self.ts[i] = a.ts
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def __iter__(self):
+        # oldest retained attempt first
+        start = self.total - len(self)
+        for n in range(start, self.total):
+            i = n % self.capacity
+            yield Attempt(self.kinds[self.kind[i]], _ns(self.pw[i]), _ns(self.delay[i]), self.iter[i], self.outcome[i], self.ts[i])
+
+class CampaignResult:
+    """
+    What run_campaigns returns: counters, the recent-attempts ring and where raw replies went.
+    After a resume the counters (and attempts) cover the whole campaign, new_attempts only this
+    run; iterating yields the attempts of this run still held in the ring.
+    """
+    def __init__(self, stats, recent, spill_path=None):
+        self.stats = stats
+        self.recent = recent
+        self.spill_path = spill_path
+
+    @property
+    def attempts(self):
+        return self.stats.totals[0]
+
+    @property
+    def new_attempts(self):
+        return self.recent.total
+
+    def summary(self):
+        return self.stats.summary()
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __repr__(self):
+        s = self.stats.summary()
+        counts = ' '.join(f"{o}={s[o]}" for o in OUTCOMES if s[o])
+        return f"<CampaignResult {self.attempts} attempts ({self.new_attempts} this run): {counts or 'none'}>"
+
+class SpillFile:
+    """Append-only JSON-lines sink for raw replies when no DB is attached."""
+    def __init__(self, path):
+        self.path = path
+        self.fh = open(path, 'a')
+
+    def write(self, attempt):
+        self.fh.write(json.dumps(attempt.as_dict()) + '\n')
+
+    def close(self):
+        self.fh.close()
@@ -0,0 +1,194 @@
+"""
+Bench farm scheduler: runs probe/recon/flash/glitch jobs on several attached devices at once.
+
+Manifest (JSON):
+  {
+    "defaults": {"transport": "pico", "stages": ["probe", "flash"], "retries": 1, "timeout": 600},
+    "jobs": [
+      {"device": "pico-a", "port": "/dev/ttyACM0", "target": "router-v2"},
+      {"device": "pico-b", "port": "/dev/ttyACM1", "target": "cam-v1", "stages": ["glitch"]}
+    ]
+  }
+
+Jobs on the same link (transport + port, whatever their "device" names) run one after
+another; different links run in parallel. Every attempt runs in its own process, reporting
+over its own pipe, so a hung serial read can be killed on timeout (SIGTERM first, which still
+closes the job's session). Workers open their own HardpwnDB connection on the
+shared file (WAL mode). A job fails (and is retried) when a stage raises, produces nothing
+or logs a failure.
+"""
+import json
+import multiprocessing as mp
+import signal
+import threading
+import time
+import traceback
+
+from hardpwn.utils.db import HardpwnDB
+from hardpwn.utils.session import STAGES, close_session, open_session, parse_region, run_stages
+
+JOB_DEFAULTS = {'transport': 'pico', 'stages': ['probe'], 'retries': 1, 'timeout': 600, 'retry_delay': 5.0}
+
+def load_manifest(path):
+    with open(path) as fh:
+        manifest = json.load(fh)
+    defaults = dict(JOB_DEFAULTS, **manifest.get('defaults', {}))
+    jobs = []
+    for i, j in enumerate(manifest.get('jobs', [])):
+        job = dict(defaults, **j)
+        job.setdefault('device', job.get('port') or job['transport'])
+        # the index keeps e.g. a probe job and a glitch job on one board apart
+        job.setdefault('name', f"{job['device']}:{job['target']}#{i}" if job.get('target') else f"{job['device']}#{i}")
+        if any(job['name'] == other['name'] for other in jobs):
+            raise ValueError(f"job {job['name']}: duplicate job name")
+        unknown = [s for s in job['stages'] if s not in STAGES]
+        if unknown:
+            raise ValueError(f"job {job['name']}: unknown stages {unknown}")
+        jobs.append(job)
+    return jobs
+
+def _link(job):
+    # jobs that would open the same physical link must not run at the same time
+    return (job['transport'], job.get('port'))
+
+def _stage_problem(stage, result, new_logs):
+    """Why a stage that returned normally still counts as failed, or None."""
+    # SPI tuning failures fall back to an untuned dump, so only dump/region failures count
+    failed = [m for m in new_logs if 'dump failed' in m or m.startswith('JTAG region')]
+    if failed:
+        return f"{stage}: {failed[0]}"
+    if stage == 'probe' and not result.findings:
+        return "probe: no interfaces found"
+    if stage == 'recon' and not result:
+        return "recon: no chips identified"
+    if stage == 'flash' and not result:
+        return "flash: nothing dumped"
+    if stage == 'glitch' and not result.attempts:
+        return "glitch: no attempts made"
+    return None
+
+def _terminated(signum, frame):
+    # the scheduler's timeout kill: unwind so close_session() still stops OpenOCD etc.
+    raise SystemExit("terminated by the bench scheduler")
+
+def _run_job(job, db_path, conn):
+    # runs in a child process: fresh transports and DB connection per attempt; events go
+    # back over this attempt's own pipe, so killing it cannot corrupt another job's channel
+    signal.signal(signal.SIGTERM, _terminated)
+    name = job['name']
+    emit = lambda kind, payload: conn.send((kind, name, payload))
+    problems = []
+    try:
+        db = HardpwnDB(db_path)
+        ap, ff, gl = open_session(job['transport'], job.get('port'), db, openocd_cfg=job.get('openocd_cfg'),
+                                  jtag_regions=[parse_region(r) if isinstance(r, str) else r for r in job.get('jtag_regions', [])],
+                                  uart_boot=job.get('uart_boot'), target_uart=job.get('target_uart'))
+        try:
+            for stage in [s for s in STAGES if s in job['stages']]:
+                emit('stage', stage)
+                seen = len(ff.logs)
+                out = run_stages([stage], ap, ff, gl, target=job.get('target'), exhaustive=job.get('exhaustive', False),
+                                 log=lambda msg: emit('log', msg))
+                problem = _stage_problem(stage, out[stage], ff.logs[seen:])
+                if problem:
+                    problems.append(problem)
+                    emit('error', problem)
+        finally:
+            close_session(ap, ff, gl)
+    except BaseException as e:
+        emit('error', f"{e.__class__.__name__}: {e}")
+        emit('log', traceback.format_exc())
+        raise SystemExit(1)
+    if problems:
+        raise SystemExit(1)
+
+class BenchScheduler:
+    def __init__(self, jobs, db_path='results/hardpwn.db', log=print):
+        self.jobs = jobs
+        self.db_path = db_path
+        self.log = log
+        self.status = {j['name']: {'device': j['device'], 'stage': '-', 'state': 'queued', 'attempt': 0, 'error': None, 'msg': ''}
+                       for j in jobs}
+        self._lock = threading.Lock()
+
+    def _set(self, name, **kw):
+        with self._lock:
+            self.status[name].update(kw)
+
+    def _link_worker(self, jobs):
+        # one job at a time per link; each attempt is a separate process we can kill
+        for job in jobs:
+            name = job['name']
+            attempts = 1 + max(0, int(job['retries']))
+            for attempt in range(1, attempts + 1):
+                self._set(name, state='running', attempt=attempt, stage='-')
+                recv, send = mp.Pipe(duplex=False)
+                proc = mp.Process(target=_run_job, args=(job, self.db_path, send), name=name)
+                proc.start()
+                send.close()
+                self._pump(recv, proc, job['timeout'])
+                last = attempt == attempts
+                if proc.is_alive():
+                    # SIGTERM first so the job closes its session, then give up on it
+                    proc.terminate()
+                    self._pump(recv, proc, 5)
+                    if proc.is_alive():
+                        proc.kill()
+                    proc.join()
+                    self._set(name, state='timeout' if last else 'retrying', error=f"timed out after {job['timeout']}s")
+                elif proc.exitcode == 0:
+                    self._set(name, state='done', error=None)
+                    break
+                else:
+                    self._set(name, state='failed' if last else 'retrying')
+                recv.close()
+                if not last:
+                    time.sleep(job['retry_delay'])
+
+    def render(self):
+        with self._lock:
+            rows = sorted(self.status.items(), key=lambda kv: kv[1]['device'])
+            done = sum(1 for _, s in rows if s['state'] in ('done', 'failed', 'timeout'))
+            lines = [f"[bench] {done}/{len(rows)} jobs finished"]
+            for name, s in rows:
+                note = s['error'] if s['error'] and s['state'] != 'done' else s['msg']
+                lines.append(f"  {s['device']:<12} {name:<28} {s['state']:<8} stage={s['stage']:<7} try={s['attempt']}  {note[:60]}")
+        return "\n".join(lines)
+
+    def _pump(self, conn, proc, timeout):
+        """Apply one attempt's events until it exits or timeout passes."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if not conn.poll(min(0.5, max(0.0, deadline - time.time()))):
+                    continue
+                kind, name, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'stage':
+                self._set(name, stage=payload)
+            elif kind == 'log':
+                self._set(name, msg=payload.strip().splitlines()[-1] if payload.strip() else '')
+            elif kind == 'error':
+                self._set(name, error=payload)
+        proc.join(max(0.0, deadline - time.time()))
+
+    def run(self):
+        """Run every job; returns one status dict per job (state: done/failed/timeout)."""
+        per_link = {}
+        for job in self.jobs:
+            per_link.setdefault(_link(job), []).append(job)
+        threads = [threading.Thread(target=self._link_worker, args=(jobs,), name=f"bench-{jobs[0]['device']}", daemon=True)
+                   for jobs in per_link.values()]
+        for t in threads:
+            t.start()
+        last = None
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+            view = self.render()
+            if view != last:
+                self.log(view)
+                last = view
+        if self.render() != last:
+            self.log(self.render())
+        return [dict(self.status[j['name']], name=j['name']) for j in self.jobs]
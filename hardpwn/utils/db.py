@@ -6,11 +6,16 @@ import time
 class HardpwnDB:
     def __init__(self, path='results/hardpwn.db'):
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.path = path
+        # WAL + busy timeout so bench workers in separate processes can share one DB file
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self.conn.execute('PRAGMA journal_mode=WAL')
         self._init_schema()
 
     def _init_schema(self):
         c = self.conn.cursor()
+        # one write transaction, so bench workers opening a fresh file don't race the migration
+        c.execute('BEGIN IMMEDIATE')
         c.execute('''CREATE TABLE IF NOT EXISTS probes (
             id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, interface TEXT, data TEXT)''')
         c.execute('''CREATE TABLE IF NOT EXISTS chips (
@@ -19,6 +24,18 @@ class HardpwnDB:
             id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, path TEXT, size INTEGER)''')
         c.execute('''CREATE TABLE IF NOT EXISTS glitches (
             id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, params TEXT, result TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS pinouts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, fingerprint TEXT UNIQUE, label TEXT, findings TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, spec TEXT, seed INTEGER, cursor INTEGER, state TEXT, status TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS link_tuning (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT, target TEXT, link TEXT, freq INTEGER, mode INTEGER, details TEXT,
+            UNIQUE(target, link))''')
+        # glitch rows from older DBs predate campaign links
+        cols = [r[1] for r in c.execute('PRAGMA table_info(glitches)')]
+        if 'campaign_id' not in cols:
+            c.execute('ALTER TABLE glitches ADD COLUMN campaign_id INTEGER')
+            c.execute('ALTER TABLE glitches ADD COLUMN seq INTEGER')
         self.conn.commit()
 
     def log_probe(self, interface, data):
@@ -43,20 +60,90 @@ class HardpwnDB:
                           (ts, path, size))
         self.conn.commit()
 
-    def log_glitch(self, params, result):
+    def log_glitch(self, params, result, commit=True, campaign_id=None, seq=None):
+        # commit=False lets long campaigns batch rows and call commit() periodically
         ts = time.ctime()
-        self.conn.execute('INSERT INTO glitches (ts,params,result) VALUES (?,?,?)',
-                          (ts, json.dumps(params), json.dumps(result)))
+        self.conn.execute('INSERT INTO glitches (ts,params,result,campaign_id,seq) VALUES (?,?,?,?,?)',
+                          (ts, json.dumps(params), json.dumps(result), campaign_id, seq))
+        if commit:
+            self.conn.commit()
+
+    def create_campaign(self, spec, seed=None):
+        """Store a campaign definition (list of campaign dicts) and return its id."""
+        ts = time.ctime()
+        cur = self.conn.execute('INSERT INTO campaigns (ts,spec,seed,cursor,state,status) VALUES (?,?,?,?,?,?)',
+                                (ts, json.dumps(spec), seed, 0, None, 'running'))
+        self.conn.commit()
+        return cur.lastrowid
+
+    def save_campaign(self, campaign_id, cursor, state, status=None, commit=True):
+        # call with commit=False right before commit() so the cursor lands with the glitch rows
+        self.conn.execute('UPDATE campaigns SET ts=?, cursor=?, state=?, status=COALESCE(?,status) WHERE id=?',
+                          (time.ctime(), cursor, json.dumps(state), status, campaign_id))
+        if commit:
+            self.conn.commit()
+
+    def get_campaign(self, campaign_id=None):
+        """A stored campaign as a dict; with no id, the most recent one that has not finished."""
+        if campaign_id is None:
+            row = self.conn.execute("SELECT id,spec,seed,cursor,state,status FROM campaigns WHERE status!='done' "
+                                    "ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = self.conn.execute('SELECT id,spec,seed,cursor,state,status FROM campaigns WHERE id=?',
+                                    (campaign_id,)).fetchone()
+        if row is None:
+            return None
+        cid, spec, seed, cursor, state, status = row
+        return {'id': cid, 'spec': json.loads(spec), 'seed': seed, 'cursor': cursor,
+                'state': json.loads(state) if state else None, 'status': status}
+
+    def commit(self):
         self.conn.commit()
 
+    def save_pinout(self, fingerprint, findings, label=None):
+        """Store (or refresh) the pinout for a target fingerprint; findings is a list of dicts."""
+        ts = time.ctime()
+        # an unlabeled re-probe keeps whatever label the fingerprint was saved under before
+        self.conn.execute('INSERT OR REPLACE INTO pinouts (ts,fingerprint,label,findings) VALUES '
+                          '(?,?,COALESCE(?,(SELECT label FROM pinouts WHERE fingerprint=?)),?)',
+                          (ts, fingerprint, label, fingerprint, json.dumps(findings)))
+        self.conn.commit()
+
+    def get_pinouts(self, label=None, limit=16):
+        """Most recent cached pinouts first, optionally only those saved under a user label."""
+        if label:
+            rows = self.conn.execute('SELECT fingerprint,label,findings FROM pinouts WHERE label=? ORDER BY id DESC LIMIT ?',
+                                     (label, limit)).fetchall()
+        else:
+            rows = self.conn.execute('SELECT fingerprint,label,findings FROM pinouts ORDER BY id DESC LIMIT ?',
+                                     (limit,)).fetchall()
+        return [(fp, lbl, json.loads(findings)) for fp, lbl, findings in rows]
+
+    def save_link_tuning(self, target, link, tuning):
+        """Store the tuned setting of one link ('spi', ...) for a target; tuning is LinkTuner.tune()'s dict."""
+        ts = time.ctime()
+        self.conn.execute('INSERT OR REPLACE INTO link_tuning (ts,target,link,freq,mode,details) VALUES (?,?,?,?,?,?)',
+                          (ts, target, link, tuning['freq'], tuning['mode'], json.dumps(tuning)))
+        self.conn.commit()
+
+    def get_link_tuning(self, target, link):
+        row = self.conn.execute('SELECT details FROM link_tuning WHERE target=? AND link=?', (target, link)).fetchone()
+        return json.loads(row[0]) if row else None
+
     def export_json(self, path='results/session.json'):
-        out = {'probes':[], 'chips':[], 'dumps':[], 'glitches':[]}
-        c = self.conn.cursor()
-        for table in out.keys():
-            rows = c.execute(f'SELECT * FROM {table}').fetchall()
-            cols = [d[0] for d in c.execute(f'PRAGMA table_info({table})')]
-            out[table] = [dict(zip(cols,row)) for row in rows]
+        # written row by row from the cursor: a 10^6-attempt glitches table never sits in memory
+        tables = ['probes', 'chips', 'dumps', 'glitches', 'pinouts', 'campaigns', 'link_tuning']
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path,'w') as fh:
-            json.dump(out, fh, indent=2)
+            fh.write('{')
+            for n, table in enumerate(tables):
+                c = self.conn.execute(f'SELECT * FROM {table}')
+                cols = [d[0] for d in c.description]
+                fh.write(f'{"," if n else ""}\n  {json.dumps(table)}: [')
+                sep = '\n    '
+                for row in c:
+                    fh.write(sep + json.dumps(dict(zip(cols,row))))
+                    sep = ',\n    '
+                fh.write('\n  ]' if sep != '\n    ' else ']')
+            fh.write('\n}\n')
         return path
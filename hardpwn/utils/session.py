@@ -0,0 +1,83 @@
+"""
+Backend selection and the probe -> recon -> flash -> glitch stage runner shared by the
+CLI (main.py) and the bench scheduler.
+"""
+from hardpwn.autoprober.autoprober import AutoProber
+from hardpwn.autoprober.types import Finding, ProbeReport
+from hardpwn.firmflasher.flasher import FirmFlasher
+from hardpwn.glitchlab.glitchlab import GlitchLab
+from hardpwn.glitchlab.console import open_console
+
+STAGES = ["probe", "recon", "flash", "glitch"]
+
+def choose_backends(transport, port, db, openocd_cfg=None, uart_boot=None, target_uart=None):
+    """target_uart: 'PORT[:BAUD]' of a host serial port on the target console, used to classify glitches."""
+    console = open_console(target_uart)
+    if transport == "pi":
+        from hardpwn.autoprober.pigpio_transport import PiGpioTransport as APTrans
+        from hardpwn.firmflasher.pigpio_transport import PiGpioFlasherTransport as FFTrans
+        from hardpwn.glitchlab.pigpio_glitch_transport import PiGpioGlitchTransport as GTrans
+        ap = APTrans(db)
+        ff = FFTrans(db, openocd_cfg=openocd_cfg, uart_boot=uart_boot)
+        gl = GTrans(db, console=console)
+    else:
+        if not port:
+            raise SystemExit("Pico transport requires --port")
+        from hardpwn.autoprober.pico_transport import PicoSerialTransport as APTrans
+        from hardpwn.firmflasher.pico_transport import PicoFlasherTransport as FFTrans
+        from hardpwn.glitchlab.pico_glitch_transport import PicoGlitchTransport as GTrans
+        ap = APTrans(port, db)
+        ff = FFTrans(port, db, uart_boot=uart_boot)
+        gl = GTrans(port, db, console=console)
+    return ap, ff, gl
+
+def open_session(transport, port, db, openocd_cfg=None, jtag_regions=None, uart_boot=None, target_uart=None):
+    ap, ff, gl = choose_backends(transport, port, db, openocd_cfg=openocd_cfg, uart_boot=uart_boot, target_uart=target_uart)
+    return AutoProber(ap, db), FirmFlasher(ff, db, jtag_regions=jtag_regions), GlitchLab(gl, db)
+
+def close_session(ap, ff, gl):
+    """Release the transports of a session: resident OpenOCD, probed pins, target console."""
+    for part in (ap, ff, gl):
+        t = getattr(part, 't', None)
+        if t is not None and hasattr(t, 'close'):
+            try:
+                t.close()
+            except Exception:
+                pass
+
+def parse_region(spec):
+    """'name:addr:size' (addr/size in any int() base, e.g. flash:0x08000000:0x100000)."""
+    name, addr, size = spec.split(':')
+    return {'name': name, 'addr': int(addr, 0), 'size': int(size, 0)}
+
+def run_stages(stages, ap, ff, gl, target=None, use_cache=True, exhaustive=False, campaign_id=None, log=print):
+    """
+    Run the requested stages in pipeline order; returns {stage: result}.
+    campaign_id makes the glitch stage resume that stored campaign instead of starting one.
+    """
+    out = {}
+    if "probe" in stages:
+        log("[*] Running probe...")
+        report = ProbeReport(target_id=target or "target")
+        # findings are printed (and already in the DB) as soon as each one is confirmed
+        for ev in ap.iter_probe(target_id=target, use_cache=use_cache, exhaustive=exhaustive, report=report):
+            if isinstance(ev, Finding):
+                log(f"     + {ev.kind} {ev.pins} {ev.meta}")
+        out["probe"] = report
+        log(f"[*] Probe finished: {[f.kind for f in report.findings]}")
+    if "recon" in stages:
+        log("[*] Running recon (chip identification)...")
+        out["recon"] = ap.run_recon()
+        log(f"[*] Recon finished: {out['recon']}")
+    if "flash" in stages:
+        log("[*] Running firmware dump...")
+        out["flash"] = ff.run_dump(target_id=target)
+        log(f"[*] Firmware dump finished: {out['flash']}")
+    if "glitch" in stages:
+        if campaign_id is not None:
+            log(f"[*] Resuming glitch campaign {campaign_id}...")
+        else:
+            log("[*] Running glitch campaigns...")
+        out["glitch"] = gl.run_campaigns(campaign_id=campaign_id)
+        log(f"[*] Glitch campaign {gl.campaign_id} finished: {out['glitch']}")
+    return out
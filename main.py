@@ -11,61 +11,84 @@ Examples:
 
   # Full run (probe -> recon -> flash -> glitch)
   sudo python3 main.py all --transport pi
+
+  # Dump internal flash over JTAG through a resident OpenOCD
+  sudo python3 main.py flash --transport pi --openocd-cfg interface/raspberrypi-native.cfg --openocd-cfg target/stm32f1x.cfg --jtag-region flash:0x08000000:0x20000
+
+  # Dump an STM32 through its ROM bootloader on a USB-UART adapter
+  python3 main.py flash --transport pico --port /dev/ttyACM0 --uart-boot /dev/ttyUSB0 --uart-protocol stm32
+
+  # Run a manifest of jobs across every attached Pico in parallel
+  python3 main.py bench --manifest bench.json
+
+  # Continue a glitch campaign that was interrupted (default: the latest unfinished one)
+  python3 main.py resume --transport pico --port /dev/ttyACM0 --campaign 3
+
+  # Label the board so repeat probes reuse its cached pinout
+  python3 main.py probe --transport pico --port /dev/ttyACM0 --target router-v2
 """
 import argparse
 import os
 import sys
 from hardpwn.utils.db import HardpwnDB
+from hardpwn.utils.session import STAGES, close_session, open_session, parse_region, run_stages
 
 def parse_args():
     p = argparse.ArgumentParser()
-    p.add_argument("action", choices=["probe","recon","flash","glitch","all"], help="Action")
-    p.add_argument("--transport", choices=["pi","pico"], required=True, help="Transport to use")
+    p.add_argument("action", choices=["probe","recon","flash","glitch","all","bench","resume"], help="Action")
+    p.add_argument("--transport", choices=["pi","pico"], help="Transport to use")
     p.add_argument("--port", help="Serial port for pico (e.g. /dev/ttyACM0)")
-    return p.parse_args()
-
-def choose_backends(transport, port, db):
-    if transport == "pi":
-        from hardpwn.autoprober.pigpio_transport import PiGpioTransport as APTrans
-        from hardpwn.firmflasher.pigpio_transport import PiGpioFlasherTransport as FFTrans
-        from hardpwn.glitchlab.pigpio_glitch_transport import PiGpioGlitchTransport as GTrans
-        ap = APTrans(db)
-        ff = FFTrans(db)
-        gl = GTrans(db)
-    else:
-        if not port:
-            raise SystemExit("Pico transport requires --port")
-        from hardpwn.autoprober.pico_transport import PicoSerialTransport as APTrans
-        from hardpwn.firmflasher.pico_transport import PicoFlasherTransport as FFTrans
-        from hardpwn.glitchlab.pico_glitch_transport import PicoGlitchTransport as GTrans
-        ap = APTrans(port, db)
-        ff = FFTrans(port, db)
-        gl = GTrans(port, db)
-    return ap, ff, gl
+    p.add_argument("--target", help="Board label; keys the pinout cache")
+    p.add_argument("--no-cache", action="store_true", help="Ignore cached pinouts and run the full search")
+    p.add_argument("--exhaustive", action="store_true", help="Keep probing after the first hit of each protocol")
+    p.add_argument("--openocd-cfg", action="append", help="OpenOCD config file for JTAG dumps (repeatable)")
+    p.add_argument("--jtag-region", action="append", default=[], help="JTAG dump region name:addr:size (repeatable)")
+    p.add_argument("--uart-boot", help="Host serial port wired to the target's ROM bootloader")
+    p.add_argument("--uart-protocol", choices=["stm32","esp"], default="stm32", help="ROM bootloader protocol")
+    p.add_argument("--uart-region", action="append", default=[], help="Bootloader dump region name:addr:size (repeatable)")
+    p.add_argument("--target-uart", help="Host serial port on the target console, PORT[:BAUD], for glitch classification")
+    p.add_argument("--campaign", type=int, help="Glitch campaign id for the resume action")
+    p.add_argument("--manifest", help="Bench job manifest (JSON) for the bench action")
+    args = p.parse_args()
+    if args.action == "bench" and not args.manifest:
+        p.error("bench requires --manifest")
+    if args.action != "bench" and not args.transport:
+        p.error("--transport is required")
+    return args
 
 def main():
     args = parse_args()
     os.makedirs("results", exist_ok=True)
     db = HardpwnDB("results/hardpwn.db")
 
-    ap, ff, gl = choose_backends(args.transport, args.port, db)
-
-    if args.action in ("probe", "all"):
-        print("[*] Running probe...")
-        report = ap.run_probe()
-        print("[*] Probe finished.")
-    if args.action in ("recon", "all"):
-        print("[*] Running recon (chip identification)...")
-        recon = ap.run_recon()
-        print("[*] Recon finished:", recon)
-    if args.action in ("flash", "all"):
-        print("[*] Running firmware dump...")
-        dumps = ff.run_dump()
-        print("[*] Firmware dump finished:", dumps)
-    if args.action in ("glitch", "all"):
-        print("[*] Running glitch campaigns...")
-        out = gl.run_campaigns()
-        print("[*] Glitch campaigns finished:", out)
+    if args.action == "bench":
+        from hardpwn.utils.bench import BenchScheduler, load_manifest
+        results = BenchScheduler(load_manifest(args.manifest), db.path).run()
+        failed = [r for r in results if r['state'] != 'done']
+        print(f"[*] Bench finished: {len(results)-len(failed)}/{len(results)} jobs done")
+    elif args.action == "resume":
+        stored = db.get_campaign(args.campaign)
+        if stored is None:
+            raise SystemExit(f"No campaign {args.campaign} to resume" if args.campaign else "No unfinished campaign to resume")
+        ap, ff, gl = open_session(args.transport, args.port, db, target_uart=args.target_uart)
+        try:
+            run_stages(["glitch"], ap, ff, gl, campaign_id=stored['id'])
+        finally:
+            close_session(ap, ff, gl)
+    else:
+        uart_boot = None
+        if args.uart_boot:
+            uart_boot = {'port': args.uart_boot, 'protocol': args.uart_protocol,
+                         'regions': [parse_region(r) for r in args.uart_region] or None}
+        ap, ff, gl = open_session(args.transport, args.port, db, openocd_cfg=args.openocd_cfg,
+                                  jtag_regions=[parse_region(r) for r in args.jtag_region], uart_boot=uart_boot,
+                                  target_uart=args.target_uart)
+        stages = STAGES if args.action == "all" else [args.action]
+        try:
+            run_stages(stages, ap, ff, gl, target=args.target, use_cache=not args.no_cache,
+                       exhaustive=args.exhaustive)
+        finally:
+            close_session(ap, ff, gl)
 
     print("[*] Exporting session JSON")
     out = db.export_json("results/session.json")
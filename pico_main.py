@@ -1,26 +1,113 @@
 # pico_main.py - MicroPython firmware for Raspberry Pi Pico
 # Implements a simple line protocol. Responds JSON on a single line for structured commands,
 # and for large dumps sends a JSON header with {"size":N} then streams N raw bytes.
+#
+# The command link is the USB CDC port (/dev/ttyACM* on the host). Set LINK_USB = False to run
+# the same protocol over UART0 (GP0/GP1) instead.
 
-import sys, ujson, utime
-from machine import Pin, SPI, I2C, UART
+import sys, gc, ujson, utime, ubinascii, uselect, micropython
+from array import array
+from machine import Pin, SPI, I2C, UART, mem32
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+LINK_USB = True
+LINK_BAUD = 115200
 
-uart = UART(0, 115200)
 # Adjust pins below if you wire differently
 SPI_SCK = 18
 SPI_MOSI = 19
 SPI_MISO = 16
 SPI_CS = 17
+SPI_DUMP_SIZE = 64*1024      # used when the host does not pass a size
+SPI_DUMP_FREQ = 10000000     # used when the host does not pass a clock
+
+LINE_MAX = 512
+DUMP_CHUNK = 4096
+DUMP_STALL_MS = 2000         # a dump gives up when neither core makes progress for this long
+
+# Header GPIOs used by the on-device pin scanners (GP23..25 are board-internal on the Pico)
+SCAN_PINS = [p for p in list(range(0,23)) + [26,27,28] if LINK_USB or p > 1]
+SCAN_DELAY = 8               # busy-loop iterations per half clock in the bit-banged scanners
+
+_cdc = None
+if LINK_USB:
+    try:
+        # micropython-lib usb-device-cdc: readinto() returns whatever is pending, so a burst
+        # lands in _rxbuf in one call. It takes over the USB port from the REPL.
+        import usb.device
+        from usb.device.cdc import CDCInterface
+        _cdc = CDCInterface()
+        usb.device.get().init(_cdc, builtin_driver=False)
+    except ImportError:
+        _cdc = None
+if _cdc is not None:
+    _rx = _tx = _poll_src = _cdc
+elif LINK_USB:
+    # firmware without usb.device: stdin.readinto() blocks until the whole buffer is filled,
+    # so reads are gated on poll() one byte at a time
+    _rx = sys.stdin.buffer
+    _tx = sys.stdout.buffer
+    _poll_src = sys.stdin
+else:
+    _rx = _tx = UART(0, LINK_BAUD, rxbuf=1024, txbuf=1024)
+    _poll_src = _rx
+_poll = uselect.poll()
+_poll.register(_poll_src, uselect.POLLIN)
+
+# Preallocated buffers, reused for every command so the main loop does not churn the heap
+_line = bytearray(LINE_MAX)
+_rxbuf = bytearray(64)
+_one = bytearray(1)
+_dump_buf = (bytearray(DUMP_CHUNK), bytearray(DUMP_CHUNK))
+_dump_mv = (memoryview(_dump_buf[0]), memoryview(_dump_buf[1]))
+_dump_len = [0, 0]       # bytes waiting in each dump buffer, 0 = free, -1 = reader failed
+_dump_busy = [False]
+_dump_abort = [False]    # set by core0 when it stops sending; core1 then drops out too
+_dump_cmd = bytearray(5)
 
 def reply(obj):
     try:
-        uart.write(ujson.dumps(obj) + "\\n")
+        _tx.write(ujson.dumps(obj))
     except Exception as e:
-        uart.write(ujson.dumps({"error":str(e)}) + "\\n")
+        _tx.write(ujson.dumps({"error":str(e)}))
+    _tx.write(b"\n")
+
+def _read_pending(timeout_ms):
+    # Move whatever the link has pending into _rxbuf; waits up to timeout_ms for the first byte.
+    if not _poll.poll(timeout_ms):
+        return 0
+    if _cdc is not None:
+        return _rx.readinto(_rxbuf) or 0
+    if not LINK_USB:
+        return _rx.readinto(_rxbuf, min(_rx.any(), len(_rxbuf))) or 0
+    n = 0
+    while n < len(_rxbuf):
+        _rx.readinto(_one)
+        _rxbuf[n] = _one[0]
+        n += 1
+        if not _poll.poll(0):
+            break
+    return n
+
+_spi = [None, None]   # [bus, (sck, mosi, miso, freq, mode)]
+
+def _spi_bus(sck, mosi, miso, freq, mode=0):
+    # Reconfigure the peripheral only when pins/clock/mode change between commands
+    cfg = (sck, mosi, miso, freq, mode)
+    if _spi[1] != cfg:
+        if _spi[0] is not None:
+            _spi[0].deinit()
+        bus = 1 if sck in (10, 14, 26) else 0
+        _spi[0] = SPI(bus, baudrate=freq, polarity=(mode >> 1) & 1, phase=mode & 1,
+                      sck=Pin(sck), mosi=Pin(mosi), miso=Pin(miso))
+        _spi[1] = cfg
+    return _spi[0]
 
 def handle_list_pins():
-    # Pico GPIOs 0..26 are common; return a simple list
-    reply({"pins": list(range(0,27))})
+    reply({"pins": SCAN_PINS})
 
 def handle_check_uart():
     reply({"ok": True})
@@ -28,8 +115,7 @@ def handle_check_uart():
 def handle_check_spi():
     # quick test: init SPI bus (may conflict with hardware wiring)
     try:
-        spi = SPI(0, sck=Pin(SPI_SCK), mosi=Pin(SPI_MOSI), miso=Pin(SPI_MISO))
-        spi.deinit()
+        _spi_bus(SPI_SCK, SPI_MOSI, SPI_MISO, SPI_DUMP_FREQ)
         reply({"ok": True})
     except Exception as e:
         reply({"ok": False, "error": str(e)})
@@ -45,33 +131,441 @@ def handle_i2c_scan(sda, scl, freq):
 def hexlify(b):
     return ubinascii.hexlify(b).decode() if b else ""
 
-def handle_spi_xfer(sclk, mosi, miso, cs, hexd):
-    import ubinascii
+def handle_spi_xfer(sclk, mosi, miso, cs, hexd, freq=1000000, mode=0):
     data = ubinascii.unhexlify(hexd)
     try:
-        spi = SPI(0, sck=Pin(sclk), mosi=Pin(mosi), miso=Pin(miso))
+        spi = _spi_bus(sclk, mosi, miso, freq, mode)
         cs_pin = Pin(cs, Pin.OUT)
         cs_pin.value(0)
         resp = bytearray(len(data))
         spi.write_readinto(data, resp)
         cs_pin.value(1)
-        reply({"resp": ubinascii.hexlify(resp).decode()})
+        reply({"resp": hexlify(resp)})
     except Exception as e:
         reply({"resp":"", "error": str(e)})
 
-def handle_spi_dump():
-    # This is a high-level example for demo. Real SPI dump needs chip-specific commands and speed.
-    import ubinascii
-    spi = SPI(0, sck=Pin(SPI_SCK), mosi=Pin(SPI_MOSI), miso=Pin(SPI_MISO))
-    size = 64*1024  # change per need and wiring
-    uart.write(ujson.dumps({"size": size}) + "\\n")
-    # naive read: issue 0x03 reads (not universally correct)
-    for addr in range(0, size, 256):
-        cmd = bytes([0x03, (addr>>16)&0xFF, (addr>>8)&0xFF, addr&0xFF]) + bytes([0]*256)
-        resp = bytearray(len(cmd))
-        spi.write_readinto(cmd, resp)
-        # last 256 bytes are data
-        uart.write(resp[-256:])
+def _dump_begin(spi, cs_pin, addr):
+    # One FAST_READ (0x0B) with CS held low for the whole image; the flash auto-increments.
+    _dump_cmd[0] = 0x0B
+    _dump_cmd[1] = (addr >> 16) & 0xFF
+    _dump_cmd[2] = (addr >> 8) & 0xFF
+    _dump_cmd[3] = addr & 0xFF
+    _dump_cmd[4] = 0
+    cs_pin.value(0)
+    spi.write(_dump_cmd)
+
+def _dump_reader(spi, cs_pin, addr, size):
+    # Producer side of the dump (core1): fills whichever buffer the link writer has released.
+    idx = 0
+    try:
+        _dump_begin(spi, cs_pin, addr)
+        left = size
+        while left > 0:
+            while _dump_len[idx]:
+                if _dump_abort[0]:
+                    raise OSError("dump aborted")
+            n = DUMP_CHUNK if left >= DUMP_CHUNK else left
+            spi.readinto(_dump_mv[idx] if n == DUMP_CHUNK else _dump_mv[idx][:n])
+            _dump_len[idx] = n
+            left -= n
+            idx ^= 1
+    except Exception:
+        _dump_len[idx] = -1
+    cs_pin.value(1)
+    _dump_busy[0] = False
+
+def _dump_idle():
+    # a reader left behind by a failed dump sees _dump_abort and exits on its own
+    while _dump_busy[0]:
+        _dump_abort[0] = True
+
+def handle_spi_check(addr, length, freq, mode):
+    # JEDEC ID, SFDP header and the CRC32 of a FAST_READ block at one clock/mode, so the host
+    # can verify link settings (and dump blocks) without streaming the data twice
+    spi = _spi_bus(SPI_SCK, SPI_MOSI, SPI_MISO, freq, mode)
+    cs_pin = Pin(SPI_CS, Pin.OUT, value=1)
+    _dump_idle()
+    mv = _dump_mv[0]
+    cs_pin.value(0)
+    spi.write(b"\x9f")
+    spi.readinto(mv[:3])
+    cs_pin.value(1)
+    jedec = hexlify(mv[:3])
+    cs_pin.value(0)
+    spi.write(b"\x5a\x00\x00\x00\x00")
+    spi.readinto(mv[:16])
+    cs_pin.value(1)
+    sfdp = hexlify(mv[:16])
+    crc = 0
+    try:
+        _dump_begin(spi, cs_pin, addr)
+        left = length
+        while left > 0:
+            n = DUMP_CHUNK if left >= DUMP_CHUNK else left
+            spi.readinto(mv[:n])
+            crc = ubinascii.crc32(mv[:n], crc)
+            left -= n
+    finally:
+        cs_pin.value(1)
+    reply({"jedec": jedec, "sfdp": sfdp, "crc": crc})
+
+def handle_spi_dump(size, freq, addr, mode=0):
+    # SPI reads run on core1 while core0 pushes the previous buffer down the link, so the
+    # dump is paced by the USB link rather than by per-page command round trips.
+    spi = _spi_bus(SPI_SCK, SPI_MOSI, SPI_MISO, freq, mode)
+    cs_pin = Pin(SPI_CS, Pin.OUT, value=1)
+    _dump_idle()
+    _dump_len[0] = _dump_len[1] = 0
+    _dump_abort[0] = False
+    gc.collect()
+    _tx.write(ujson.dumps({"size": size, "freq": freq, "mode": mode}))
+    _tx.write(b"\n")
+    if _thread is None:
+        # no second core: read and send in turn from a single buffer
+        _dump_begin(spi, cs_pin, addr)
+        left = size
+        try:
+            while left > 0:
+                n = DUMP_CHUNK if left >= DUMP_CHUNK else left
+                mv = _dump_mv[0] if n == DUMP_CHUNK else _dump_mv[0][:n]
+                spi.readinto(mv)
+                _tx.write(mv)
+                left -= n
+        finally:
+            cs_pin.value(1)
+        return
+    _dump_busy[0] = True
+    _thread.start_new_thread(_dump_reader, (spi, cs_pin, addr, size))
+    idx = 0
+    left = size
+    t_last = utime.ticks_ms()
+    try:
+        while left > 0:
+            n = _dump_len[idx]
+            if not n:
+                if utime.ticks_diff(utime.ticks_ms(), t_last) > DUMP_STALL_MS:
+                    break
+                continue
+            if n < 0:
+                break
+            _tx.write(_dump_mv[idx] if n == DUMP_CHUNK else _dump_mv[idx][:n])
+            _dump_len[idx] = 0
+            left -= n
+            idx ^= 1
+            t_last = utime.ticks_ms()
+    finally:
+        # also reached when the link write raises: release core1 instead of leaving it waiting
+        _dump_abort[0] = True
+
+# --- on-device pinout scanners ---------------------------------------------------------------
+# Candidates are bit-banged straight through the SIO registers. The pin being read (TDO/MISO)
+# is never enumerated: GPIO_IN is sampled once per clock and every other header pin is checked
+# in the same pass, so a JTAG scan is O(n^2) and an SPI scan O(n^3) transactions.
+SIO_IN = 0xd0000004
+SIO_OUT_SET = 0xd0000014
+SIO_OUT_CLR = 0xd0000018
+SIO_OE_SET = 0xd0000024
+SIO_OE_CLR = 0xd0000028
+JTAG_BYPASS_PATTERN = 0x35A5C3B6
+
+_cap = array('I', [0]*32)        # GPIO_IN snapshot per clock
+_bits = array('I', [0]*30)       # per-pin word assembled from _cap
+_counts = array('I', [0]*30)
+_minw = array('I', [0]*30)
+_last = array('I', [0]*30)
+_widths = array('I', [0]*256)
+
+@micropython.viper
+def _jtag_shift(tck: int, tms: int, tdi: int, tms_bits: int, tdi_bits: int, n: int, cap, off: int, dly: int):
+    # n TCK cycles, LSB first; TDO is sampled on all pins just before each rising edge
+    sio = ptr32(0xd0000000)
+    out = ptr32(cap)
+    i = 0
+    while i < n:
+        if (tms_bits >> i) & 1:
+            sio[5] = tms
+        else:
+            sio[6] = tms
+        if (tdi_bits >> i) & 1:
+            sio[5] = tdi
+        else:
+            sio[6] = tdi
+        j = 0
+        while j < dly:
+            j += 1
+        out[off + i] = sio[1]
+        sio[5] = tck
+        j = 0
+        while j < dly:
+            j += 1
+        sio[6] = tck
+        i += 1
+
+@micropython.viper
+def _spi_shift(sck: int, mosi: int, bits: int, n: int, cap, off: int, dly: int):
+    # mode 0, MSB first; MISO is sampled on all pins after each rising edge
+    sio = ptr32(0xd0000000)
+    out = ptr32(cap)
+    i = 0
+    while i < n:
+        if (bits >> (n - 1 - i)) & 1:
+            sio[5] = mosi
+        else:
+            sio[6] = mosi
+        j = 0
+        while j < dly:
+            j += 1
+        sio[5] = sck
+        j = 0
+        while j < dly:
+            j += 1
+        out[off + i] = sio[1]
+        sio[6] = sck
+        i += 1
+
+@micropython.viper
+def _transpose(cap, n: int, out, msb_first: int):
+    c = ptr32(cap)
+    o = ptr32(out)
+    p = 0
+    while p < 30:
+        v = 0
+        i = 0
+        while i < n:
+            b = (c[i] >> p) & 1
+            if msb_first:
+                v = (v << 1) | b
+            else:
+                v = v | (b << i)
+            i += 1
+        o[p] = v
+        p += 1
+
+@micropython.viper
+def _edge_scan(mask: int, duration_us: int, counts, minw, last):
+    # count transitions per pin and keep the shortest pulse seen (~1 bit time for UART)
+    sio = ptr32(0xd0000000)
+    timer = ptr32(0x40054000)
+    cnt = ptr32(counts)
+    mw = ptr32(minw)
+    lt = ptr32(last)
+    start = timer[10]
+    prev = sio[1] & mask
+    while timer[10] - start < duration_us:
+        cur = sio[1] & mask
+        ch = cur ^ prev
+        if ch:
+            now = timer[10]
+            p = 0
+            while p < 30:
+                if (ch >> p) & 1:
+                    if cnt[p]:
+                        w = now - lt[p]
+                        if w < mw[p]:
+                            mw[p] = w
+                    cnt[p] += 1
+                    lt[p] = now
+                p += 1
+            prev = cur
+
+@micropython.viper
+def _edge_widths(bit: int, duration_us: int, widths, maxn: int) -> int:
+    sio = ptr32(0xd0000000)
+    timer = ptr32(0x40054000)
+    w = ptr32(widths)
+    start = timer[10]
+    last = 0
+    n = 0
+    seen = 0
+    prev = sio[1] & bit
+    while timer[10] - start < duration_us and n < maxn:
+        cur = sio[1] & bit
+        if cur != prev:
+            now = timer[10]
+            if seen:
+                w[n] = now - last
+                n += 1
+            seen = 1
+            last = now
+            prev = cur
+    return n
+
+def _parse_pins(arg):
+    if arg is None or arg == "*":
+        return SCAN_PINS
+    return [int(p) for p in arg.split(",") if int(p) in SCAN_PINS]
+
+def _scan_setup(pins):
+    # every candidate idles as a pulled-up input; the pins are taken away from SPI/I2C/UART
+    _spi[1] = None
+    mask = 0
+    for p in pins:
+        Pin(p, Pin.IN, Pin.PULL_UP)
+        mask |= 1 << p
+    return mask
+
+def _scan_drive(mask, drive, high=0):
+    mem32[SIO_OE_CLR] = mask
+    mem32[SIO_OUT_CLR] = drive
+    mem32[SIO_OUT_SET] = high
+    mem32[SIO_OE_SET] = drive
+
+def _valid_idcode(v):
+    return (v & 1) and v != 0xFFFFFFFF and ((v >> 1) & 0x7FF) != 0x7F
+
+def _valid_jedec(v):
+    return ((v >> 16) & 0xFF) not in (0x00, 0xFF) and (v & 0xFFFFFF) != 0xFFFFFF
+
+def _jtag_idcodes(tck, tms):
+    # Test-Logic-Reset (IDCODE selected) -> Run-Test/Idle -> Select-DR -> Capture-DR -> Shift-DR
+    t, m = 1 << tck, 1 << tms
+    _jtag_shift(t, m, 0, 0xBF, 0, 10, _cap, 0, SCAN_DELAY)
+    _jtag_shift(t, m, 0, 0, 0, 32, _cap, 0, SCAN_DELAY)
+    _transpose(_cap, 32, _bits, 0)
+    return _bits
+
+def _jtag_find_tdi(mask, pins, tck, tms, tdo):
+    # Load BYPASS (all ones) into every IR on the chain, then look for our pattern on TDO
+    # delayed by one bit per device.
+    t, m = 1 << tck, 1 << tms
+    for tdi in pins:
+        if tdi in (tck, tms, tdo):
+            continue
+        d = 1 << tdi
+        _scan_drive(mask, t | m | d)
+        _jtag_shift(t, m, d, 0x1BF, 0, 11, _cap, 0, SCAN_DELAY)
+        _jtag_shift(t, m, d, 0, 0x7FFFFFFF, 31, _cap, 0, SCAN_DELAY)
+        _jtag_shift(t, m, d, 0, 0x7FFFFFFF, 31, _cap, 0, SCAN_DELAY)
+        _jtag_shift(t, m, d, 0x40000000, 0x7FFFFFFF, 31, _cap, 0, SCAN_DELAY)
+        _jtag_shift(t, m, d, 0x3, 0, 4, _cap, 0, SCAN_DELAY)
+        _jtag_shift(t, m, d, 0, JTAG_BYPASS_PATTERN, 31, _cap, 0, SCAN_DELAY)
+        _transpose(_cap, 31, _bits, 0)
+        out = _bits[tdo]
+        for k in range(1, 17):
+            if (out >> k) == JTAG_BYPASS_PATTERN & ((1 << (31 - k)) - 1):
+                return tdi
+    return None
+
+def _spi_jedecs(sck, mosi, cs):
+    s, o, c = 1 << sck, 1 << mosi, 1 << cs
+    mem32[SIO_OUT_CLR] = c
+    _spi_shift(s, o, 0x9F, 8, _cap, 0, SCAN_DELAY)
+    _spi_shift(s, o, 0, 24, _cap, 8, SCAN_DELAY)
+    mem32[SIO_OUT_SET] = c
+    _transpose(_cap, 32, _bits, 1)
+    return _bits
+
+def _scan_progress(idx, total, t_last):
+    # returns None when the host sent anything (ABORT) while the scan was running
+    now = utime.ticks_ms()
+    if utime.ticks_diff(now, t_last) < 250:
+        return t_last
+    reply({"progress": idx, "total": total})
+    if _poll.poll(0):
+        reply({"done": True, "aborted": True, "progress": idx, "total": total})
+        return None
+    return now
+
+def handle_jtag_scan(pins, offset):
+    # one candidate per (tck, tms) pair; TDO is read on every other pin at once
+    mask = _scan_setup(pins)
+    total = len(pins) * (len(pins) - 1)
+    idx = 0
+    t_last = utime.ticks_ms()
+    for tck in pins:
+        for tms in pins:
+            if tms == tck:
+                continue
+            idx += 1
+            if idx <= offset:
+                continue
+            _scan_drive(mask, (1 << tck) | (1 << tms))
+            ids = _jtag_idcodes(tck, tms)
+            found = [(tdo, ids[tdo]) for tdo in pins if tdo not in (tck, tms) and _valid_idcode(ids[tdo])]
+            for tdo, v in found:
+                if _jtag_idcodes(tck, tms)[tdo] != v:
+                    continue
+                tdi = _jtag_find_tdi(mask, pins, tck, tms, tdo)
+                reply({"hit": {"tck": tck, "tms": tms, "tdi": tdi, "tdo": tdo, "idcode": "0x%08x" % v}})
+                _scan_drive(mask, (1 << tck) | (1 << tms))
+            t_last = _scan_progress(idx, total, t_last)
+            if t_last is None:
+                mem32[SIO_OE_CLR] = mask
+                return
+    mem32[SIO_OE_CLR] = mask
+    reply({"done": True, "progress": idx, "total": total})
+
+def handle_spi_scan(pins, offset):
+    # one candidate per (sclk, mosi, cs) triple; MISO is read on every other pin at once
+    mask = _scan_setup(pins)
+    n = len(pins)
+    total = n * (n - 1) * (n - 2)
+    idx = 0
+    t_last = utime.ticks_ms()
+    for sclk in pins:
+        for mosi in pins:
+            if mosi == sclk:
+                continue
+            for cs in pins:
+                if cs in (sclk, mosi):
+                    continue
+                idx += 1
+                if idx <= offset:
+                    continue
+                _scan_drive(mask, (1 << sclk) | (1 << mosi) | (1 << cs), 1 << cs)
+                ids = _spi_jedecs(sclk, mosi, cs)
+                found = [(miso, ids[miso] & 0xFFFFFF) for miso in pins
+                         if miso not in (sclk, mosi, cs) and _valid_jedec(ids[miso])]
+                for miso, v in found:
+                    if _spi_jedecs(sclk, mosi, cs)[miso] & 0xFFFFFF == v:
+                        reply({"hit": {"sclk": sclk, "mosi": mosi, "miso": miso, "cs": cs, "jedec": "%06x" % v}})
+                t_last = _scan_progress(idx, total, t_last)
+                if t_last is None:
+                    mem32[SIO_OE_CLR] = mask
+                    return
+    mem32[SIO_OE_CLR] = mask
+    reply({"done": True, "progress": idx, "total": total})
+
+def handle_uart_scan(pins, duration_ms):
+    # passive: idle UART lines sit high, so count edges and the shortest pulse on every pin
+    mask = _scan_setup(pins)
+    for p in range(30):
+        _counts[p] = 0
+        _minw[p] = 0x7FFFFFFF
+        _last[p] = 0
+    left = duration_ms
+    while left > 0:
+        step = 250 if left > 250 else left
+        _edge_scan(mask, step * 1000, _counts, _minw, _last)
+        left -= step
+        reply({"progress": duration_ms - left, "total": duration_ms})
+        if left > 0 and _poll.poll(0):
+            reply({"done": True, "aborted": True, "progress": duration_ms - left, "total": duration_ms})
+            return
+    for p in pins:
+        if _counts[p] >= 8:
+            reply({"hit": {"pin": p, "edges": _counts[p], "min_us": _minw[p]}})
+    reply({"done": True, "progress": duration_ms, "total": duration_ms})
+
+def handle_jtag_idcode(tck, tms, tdi, tdo):
+    mask = _scan_setup([p for p in (tck, tms, tdi, tdo) if p >= 0])
+    _scan_drive(mask, (1 << tck) | (1 << tms))
+    v = _jtag_idcodes(tck, tms)[tdo]
+    mem32[SIO_OE_CLR] = mask
+    reply({"idcode": "0x%08x" % v} if _valid_idcode(v) else {})
+
+def handle_spi_jedec(sclk, mosi, miso, cs):
+    # single bit-banged candidate, so pins outside the SPI pin mux can be re-checked too
+    mask = _scan_setup([sclk, mosi, miso, cs])
+    _scan_drive(mask, (1 << sclk) | (1 << mosi) | (1 << cs), 1 << cs)
+    v = _spi_jedecs(sclk, mosi, cs)[miso]
+    mem32[SIO_OE_CLR] = mask
+    reply({"jedec": "%06x" % (v & 0xFFFFFF)} if _valid_jedec(v) else {})
+
+def handle_capture_edges(pin, duration_ms):
+    _scan_setup([pin])
+    n = _edge_widths(1 << pin, duration_ms * 1000, _widths, len(_widths))
+    reply({"edges": [_widths[i] for i in range(n)]})
 
 def handle_glitch_v(pw_ns, delay_ns):
     # placeholder: implement MOSFET/power switching using a dedicated pin
@@ -93,9 +587,36 @@ def dispatch(line):
         elif cmd == "I2C_SCAN" and len(parts) >= 3:
             handle_i2c_scan(int(parts[1]), int(parts[2]), int(parts[3]) if len(parts)>3 else 100000)
         elif cmd == "SPI_XFER" and len(parts) >= 6:
-            handle_spi_xfer(int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]), parts[5])
+            # SPI_XFER sclk mosi miso cs hex [freq_hz] [mode]
+            handle_spi_xfer(int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]), parts[5],
+                            int(parts[6]) if len(parts)>6 else 1000000,
+                            int(parts[7]) if len(parts)>7 else 0)
         elif cmd == "SPI_DUMP":
-            handle_spi_dump()
+            # SPI_DUMP [size] [freq_hz] [addr] [mode]
+            handle_spi_dump(int(parts[1]) if len(parts)>1 else SPI_DUMP_SIZE,
+                            int(parts[2]) if len(parts)>2 else SPI_DUMP_FREQ,
+                            int(parts[3]) if len(parts)>3 else 0,
+                            int(parts[4]) if len(parts)>4 else 0)
+        elif cmd == "SPI_CHECK" and len(parts) >= 5:
+            # SPI_CHECK addr len freq_hz mode
+            handle_spi_check(int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]))
+        elif cmd == "JTAG_SCAN":
+            # JTAG_SCAN [pins|*] [offset]
+            handle_jtag_scan(_parse_pins(parts[1] if len(parts)>1 else None), int(parts[2]) if len(parts)>2 else 0)
+        elif cmd == "SPI_SCAN":
+            # SPI_SCAN [pins|*] [offset]
+            handle_spi_scan(_parse_pins(parts[1] if len(parts)>1 else None), int(parts[2]) if len(parts)>2 else 0)
+        elif cmd == "UART_SCAN":
+            # UART_SCAN [pins|*] [duration_ms]
+            handle_uart_scan(_parse_pins(parts[1] if len(parts)>1 else None), int(parts[2]) if len(parts)>2 else 1000)
+        elif cmd == "JTAG_IDCODE" and len(parts) >= 5:
+            handle_jtag_idcode(int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]))
+        elif cmd == "SPI_JEDEC" and len(parts) >= 5:
+            handle_spi_jedec(int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]))
+        elif cmd == "CAPTURE_EDGES" and len(parts) >= 3:
+            handle_capture_edges(int(parts[1]), int(parts[2]))
+        elif cmd == "ABORT":
+            pass    # late abort for a scan that had already finished
         elif cmd == "GLITCH_V" and len(parts) >= 3:
             handle_glitch_v(int(parts[1]), int(parts[2]))
         else:
@@ -103,26 +624,26 @@ def dispatch(line):
     except Exception as e:
         reply({"error": str(e)})
 
-# main loop reads from UART
+# main loop: drain the link in blocks, assemble lines in a fixed buffer
 def main_loop():
-    buf = b""
+    n = 0
     while True:
-        if uart.any():
-            ch = uart.read(1)
-            if not ch:
-                continue
-            if ch in (b"\\n", b"\\r"):
+        got = _read_pending(1000)
+        for i in range(got):
+            ch = _rxbuf[i]
+            if ch == 10 or ch == 13:
+                if not n:
+                    continue
                 try:
-                    line = buf.decode().strip()
+                    line = bytes(_line[:n]).decode().strip()
                 except Exception:
                     line = ""
-                buf = b""
+                n = 0
                 if line:
                     dispatch(line)
-            else:
-                buf += ch
-        else:
-            utime.sleep_ms(10)
+            elif n < LINE_MAX:
+                _line[n] = ch
+                n += 1
 
 if __name__ == "__main__":
     main_loop()
@@ -0,0 +1,155 @@
+"""
+Simulated ROM bootloaders for exercising the drivers in hardpwn/firmflasher/bootloaders.py without a target.
+
+Each simulator is a byte-level state machine (feed() takes host bytes, returns reply frames);
+serve_pty() runs one on the master side of a pty so a driver can open the slave side like a
+real USB-UART adapter.
+"""
+import os
+import pty
+import select
+import struct
+import threading
+import time
+import tty
+
+from hardpwn.firmflasher.bootloaders import ACK, NACK, ESPRomBootloader
+
+class SimSTM32:
+    """AN3155 loader answering sync, GET and READ MEMORY from `memory` mapped at `base`."""
+    def __init__(self, memory, base=0x08000000):
+        self.memory = memory
+        self.base = base
+        self.state = 'sync'
+        self.buf = bytearray()
+        self.addr = 0
+
+    def feed(self, data):
+        self.buf += data
+        b = self.buf
+        out = []
+        while True:
+            if self.state == 'sync' and len(b) >= 1:
+                out.append(bytes([ACK if b[0] == 0x7F else NACK]))
+                if b[0] == 0x7F:
+                    self.state = 'cmd'
+                del b[:1]
+            elif self.state == 'cmd' and len(b) >= 2:
+                c, x = b[0], b[1]
+                del b[:2]
+                if c ^ x != 0xFF or c not in (0x00, 0x11):
+                    out.append(bytes([NACK]))
+                elif c == 0x00:
+                    out.append(bytes([ACK, 2, 0x31, 0x00, 0x11, ACK]))
+                else:
+                    out.append(bytes([ACK]))
+                    self.state = 'addr'
+            elif self.state == 'addr' and len(b) >= 5:
+                ok = b[0] ^ b[1] ^ b[2] ^ b[3] == b[4]
+                self.addr = struct.unpack('>I', bytes(b[:4]))[0]
+                del b[:5]
+                out.append(bytes([ACK if ok else NACK]))
+                self.state = 'len' if ok else 'cmd'
+            elif self.state == 'len' and len(b) >= 2:
+                n = b[0] + 1
+                del b[:2]
+                off = self.addr - self.base
+                out.append(bytes([ACK]) + self.memory[off:off + n])
+                self.state = 'cmd'
+            else:
+                return out
+
+class SimESPRom:
+    """
+    Esptool ROM loader (ESP32 flavour: 4 status bytes) answering SYNC, CHANGE_BAUDRATE,
+    SPI_ATTACH, READ_FLASH_SLOW and READ_REG from `flash`.
+    fail_reads: indexes of READ_FLASH_SLOW requests answered with an error status
+    latency: seconds before each READ_FLASH_SLOW reply goes out (see serve_pty)
+    """
+    def __init__(self, flash, fail_reads=(), latency=0.0):
+        self.flash = flash
+        self.fail_reads = set(fail_reads)
+        self.latency = latency
+        self.reads = 0
+        self.buf = bytearray()
+
+    @staticmethod
+    def _reply(op, val=0, data=b'', status=b'\0\0\0\0'):
+        d = data + status
+        return ESPRomBootloader.slip(struct.pack('<BBHI', 1, op, len(d), val) + d)
+
+    def feed(self, data):
+        self.buf += data
+        out = []
+        while True:
+            start = self.buf.find(b'\xc0')
+            end = self.buf.find(b'\xc0', start + 1) if start >= 0 else -1
+            if end < 0:
+                return out
+            f = bytes(self.buf[start + 1:end]).replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+            del self.buf[:end + 1]
+            if len(f) < 8:
+                continue
+            _, op, _, _ = struct.unpack('<BBHI', f[:8])
+            body = f[8:]
+            E = ESPRomBootloader
+            if op == E.SYNC:
+                out += [self._reply(op)] * 3
+            elif op in (E.CHANGE_BAUDRATE, E.SPI_ATTACH):
+                out.append(self._reply(op))
+            elif op == E.READ_FLASH_SLOW:
+                addr, n = struct.unpack('<II', body[:8])
+                i, self.reads = self.reads, self.reads + 1
+                if i in self.fail_reads:
+                    out.append((self.latency, self._reply(op, status=b'\x01\x05\0\0')))
+                else:
+                    blk = self.flash[addr:addr + n]
+                    out.append((self.latency, self._reply(op, data=blk + b'\xff' * (E.FLASH_BLOCK - len(blk)))))
+            elif op == E.READ_REG:
+                addr = struct.unpack('<I', body[:4])[0]
+                out.append(self._reply(op, struct.unpack('<I', self.flash[addr:addr + 4])[0]))
+            else:
+                out.append(self._reply(op, status=b'\x01\x05\0\0'))
+
+def serve_pty(sim):
+    """
+    Run sim on a new pty; returns (slave_path, stop). Replies can be (delay, bytes) tuples,
+    which are sent from a queue in order so a slow reply delays the ones behind it.
+    """
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    path = os.ttyname(slave)
+    stopping = threading.Event()
+    queue = []
+
+    def run():
+        while not stopping.is_set():
+            wait = 0.01
+            if queue:
+                due, data = queue[0]
+                wait = max(0.0, due - time.time())
+                if not wait:
+                    queue.pop(0)
+                    os.write(master, data)
+                    continue
+            r, _, _ = select.select([master], [], [], min(wait, 0.01))
+            if r:
+                try:
+                    data = os.read(master, 4096)
+                except OSError:
+                    return
+                t = queue[-1][0] if queue else time.time()
+                for rep in sim.feed(data):
+                    delay, rep = rep if isinstance(rep, tuple) else (0.0, rep)
+                    t = max(t, time.time()) + delay
+                    queue.append((t, rep))
+
+    th = threading.Thread(target=run, daemon=True)
+    th.start()
+
+    def stop():
+        stopping.set()
+        th.join(1.0)
+        os.close(master)
+        os.close(slave)
+    return path, stop
@@ -0,0 +1,90 @@
+"""ROM bootloader drivers against the simulators in bootsim.py, over a real pty."""
+import fcntl
+import io
+import os
+import select
+import struct
+import termios
+import time
+
+from hardpwn.firmflasher.bootloaders import STM32Bootloader, ESPRomBootloader
+from bootsim import SimSTM32, SimESPRom, serve_pty
+
+IMAGE = bytes((i * 13 + 7 + (i >> 8)) & 0xFF for i in range(1 << 16))
+
+class PtySerial:
+    """Just enough of pyserial's Serial for the drivers, on a pty slave."""
+    def __init__(self, path, timeout=0.5):
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        self.timeout = timeout
+        self.baudrate = 115200
+        self.rts = self.dtr = False
+
+    @property
+    def in_waiting(self):
+        return struct.unpack('I', fcntl.ioctl(self.fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def read(self, n):
+        out = bytearray()
+        deadline = time.time() + self.timeout
+        while len(out) < n:
+            r, _, _ = select.select([self.fd], [], [], max(0.0, deadline - time.time()))
+            if not r:
+                break
+            out += os.read(self.fd, n - len(out))
+        return bytes(out)
+
+    def write(self, data):
+        os.write(self.fd, data)
+
+    def reset_input_buffer(self):
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def close(self):
+        os.close(self.fd)
+
+def _open(sim):
+    path, stop = serve_pty(sim)
+    return PtySerial(path), stop
+
+def test_stm32_dump_over_pty():
+    ser, stop = _open(SimSTM32(IMAGE))
+    try:
+        bl = STM32Bootloader(ser)
+        assert bl.connect() == STM32Bootloader.BAUDS[0]
+        assert bl.commands == bytes([0x00, 0x11])
+        fh = io.BytesIO()
+        bl.read(fh, 0x08000000 + 100, 1000)
+        assert fh.getvalue() == IMAGE[100:1100]
+    finally:
+        ser.close()
+        stop()
+
+def test_esp_dump_over_pty():
+    ser, stop = _open(SimESPRom(IMAGE))
+    try:
+        bl = ESPRomBootloader(ser)
+        assert bl.connect(bauds=[460800]) == 460800
+        fh = io.BytesIO()
+        bl.read(fh, 0x200, 5000)
+        assert fh.getvalue() == IMAGE[0x200:0x200 + 5000]
+        fh = io.BytesIO()
+        bl.read(fh, 0x100, 64, space='mem')
+        assert fh.getvalue() == IMAGE[0x100:0x140]
+    finally:
+        ser.close()
+        stop()
+
+def test_esp_retry_ignores_replies_still_in_flight():
+    # the 3rd read fails while later pipelined requests are still being answered slowly;
+    # their late replies must not be taken as data for the retried chunk
+    ser, stop = _open(SimESPRom(IMAGE, fail_reads={2}, latency=0.03))
+    try:
+        bl = ESPRomBootloader(ser, window=4)
+        bl.connect(bauds=[])
+        fh = io.BytesIO()
+        bl.read(fh, 0, 1024)
+        assert fh.getvalue() == IMAGE[:1024]
+    finally:
+        ser.close()
+        stop()
@@ -0,0 +1,84 @@
+"""Bit-banged SPI probing on the simulated GPIO (SimGpio + SimSpiFlash), no Pi needed."""
+import random
+
+from hardpwn.autoprober.autoprober import AutoProber
+from hardpwn.autoprober.gpio import BitBangSPI, SimGpio, SimSpiFlash
+from hardpwn.autoprober.pigpio_transport import PiGpioTransport
+from hardpwn.utils.db import HardpwnDB
+
+PINS = {'sclk': 11, 'mosi': 10, 'miso': 9, 'cs': 8}
+
+class SimUartNoise:
+    """A pin toggling on its own, like a chatty UART TX, that knows nothing about SPI."""
+    def __init__(self, pin, seed=1):
+        self.pin = 1 << pin
+        self.rng = random.Random(seed)
+
+    def step(self, pins):
+        return self.pin, self.pin if self.rng.getrandbits(1) else 0
+
+class CountingGpio(SimGpio):
+    def __init__(self, devices=None):
+        super().__init__(devices)
+        self.selects = 0
+
+    def output(self, pin):
+        self.selects += 1
+        super().output(pin)
+
+    def input(self, pin):
+        self.selects += 1
+        super().input(pin)
+
+def _flash():
+    return SimSpiFlash(11, 10, 9, 8, data=bytes(range(256)))
+
+def test_spi_xfer_modes():
+    t = PiGpioTransport(gpio=SimGpio([_flash()]))
+    assert t.spi_xfer(11, 10, 9, 8, b'\x9f\x00\x00\x00')[1:] == b'\xef\x40\x18'
+    assert t.spi_xfer(11, 10, 9, 8, b'\x9f\x00\x00\x00', mode=3)[1:] == b'\xef\x40\x18'
+    assert t.spi_xfer(11, 10, 9, 8, b'\x03\x00\x00\x10' + bytes(4), mode=3)[4:] == bytes([16, 17, 18, 19])
+
+def test_spi_scan_finds_flash():
+    t = PiGpioTransport(gpio=SimGpio([_flash()]))
+    events = list(t.spi_scan(pins=[8, 9, 10, 11, 14]))
+    hits = [e['hit'] for e in events if 'hit' in e]
+    assert hits == [dict(PINS, jedec='ef4018')]
+    assert events[-1] == {'done': True, 'progress': 60, 'total': 60}
+
+def test_spi_scan_ignores_toggling_pin():
+    t = PiGpioTransport(gpio=SimGpio([_flash(), SimUartNoise(5)]))
+    hits = [e['hit'] for e in t.spi_scan(pins=[5, 8, 9, 10, 11]) if 'hit' in e]
+    assert hits == [dict(PINS, jedec='ef4018')]
+
+def test_spi_scan_keeps_pin_roles_between_candidates():
+    g = CountingGpio([_flash()])
+    pins = [8, 9, 10, 11, 14, 15]
+    list(PiGpioTransport(gpio=g).spi_scan(pins=pins))
+    # stepping cs swaps two pins' roles; re-selecting every input per candidate costs far more
+    assert g.selects <= len(pins) + 3 * 120
+
+def test_release_restores_functions():
+    g = SimGpio([_flash()])
+    g.output(9)      # e.g. an LED on what turns out to be MISO
+    bb = BitBangSPI(g)
+    bb.configure(11, 10, 9, 8)
+    assert bb.xfer(b'\x9f\x00\x00\x00')[1:] == b'\xef\x40\x18'
+    assert g.function(9) == 0 and g.function(11) == 1
+    bb.release()
+    assert [g.function(p) for p in (8, 9, 10, 11)] == [0, 1, 0, 0]
+
+def test_probe_uses_cached_pinout(tmp_path):
+    db = HardpwnDB(str(tmp_path / 'hardpwn.db'))
+    t = PiGpioTransport(gpio=SimGpio([_flash()]))
+    t.uart_ports = lambda: []
+    first = AutoProber(t, db=db).run_probe()
+    spi = [(f.pins, f.meta) for f in first.findings if f.kind == 'spi']
+    assert spi == [(PINS, {'jedec': 'ef4018'})]
+
+    scans = []
+    t.spi_scan = lambda *a, **kw: scans.append(a) or iter(())
+    second = AutoProber(t, db=db).run_probe()
+    assert [(f.pins, f.meta) for f in second.findings if f.kind == 'spi'] == spi
+    assert any(l.startswith("Reused cached pinout") for l in second.logs)
+    assert not scans
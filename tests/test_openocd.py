@@ -0,0 +1,178 @@
+"""OpenOCDSession and the JTAG dump path against a stand-in TCL server (spawn=False)."""
+import io
+import re
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from hardpwn.firmflasher.flasher import FirmFlasher
+from hardpwn.firmflasher.openocd import OpenOCDSession
+
+BASE = 0x08000000
+IMAGE = bytes((i * 7 + (i >> 9)) & 0xFF for i in range(1 << 16))
+
+class StandInTCL:
+    """
+    Just enough of OpenOCD's TCL RPC: 0x1a-framed lines, `catch {...} var` / `set var`,
+    read_memory (unless legacy), mdw, adapter speed, halt and resume over IMAGE at BASE.
+    fail_at: read addresses answered with an error; stall_at: read addresses answered only
+    after `stall` seconds the first time they are asked for.
+    """
+    def __init__(self, legacy=False, fail_at=(), stall_at=(), stall=0.6):
+        self.legacy = legacy
+        self.fail_at = set(fail_at)
+        self.stall_at = set(stall_at)
+        self.stall = stall
+        self.commands = []
+        self.connections = 0
+        self.srv = socket.socket()
+        self.srv.bind(('127.0.0.1', 0))
+        self.srv.listen(4)
+        self.port = self.srv.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.srv.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _words(self, addr, count):
+        off = addr - BASE
+        return struct.unpack(f'<{count}I', IMAGE[off:off + 4 * count])
+
+    def _eval(self, cmd):
+        # (rc, result) the way `catch` reports them
+        self.commands.append(cmd)
+        op, args = cmd[0], cmd[1:]
+        if op == 'read_memory' and not self.legacy:
+            addr, count = int(args[0], 16), int(args[2])
+            if addr in self.fail_at:
+                return 1, f'read_memory: failed to read memory at {addr:#x}'
+            return 0, ' '.join(f'{w:#x}' for w in self._words(addr, count))
+        if op == 'mdw':
+            addr, count = int(args[0], 16), int(args[1])
+            if addr in self.fail_at:
+                return 1, f'mdw: failed to read memory at {addr:#x}'
+            words = self._words(addr, count)
+            return 0, '\n'.join(f'{addr + 16 * i:#010x}: ' + ' '.join(f'{w:08x}' for w in words[4 * i:4 * i + 4])
+                                for i in range((count + 3) // 4))
+        if op in ('adapter', 'halt', 'resume'):
+            return 0, ''
+        return 1, f'invalid command name "{op}"'
+
+    def _serve(self, conn):
+        buf, res = b'', ''
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    return
+                buf += data
+                while b'\x1a' in buf:
+                    line, _, buf = buf.partition(b'\x1a')
+                    m = re.match(r'catch \{(.*)\} __hardpwn_res$', line.decode())
+                    if m:
+                        cmd = m.group(1).split()
+                        if cmd[0] in ('read_memory', 'mdw') and int(cmd[1], 16) in self.stall_at:
+                            # answer after the client gave up; a client that kept the connection
+                            # would take this reply for its next command
+                            self.stall_at.discard(int(cmd[1], 16))
+                            time.sleep(self.stall)
+                        rc, res = self._eval(cmd)
+                        try:
+                            conn.sendall(str(rc).encode() + b'\x1a')
+                        except OSError:
+                            return
+                    elif line == b'set __hardpwn_res':
+                        conn.sendall(res.encode() + b'\x1a')
+                    else:
+                        conn.sendall(b'\x1a')
+
+    def close(self):
+        self.srv.close()
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def make(**kw):
+        srv = StandInTCL(**kw)
+        servers.append(srv)
+        return srv
+    yield make
+    for srv in servers:
+        srv.close()
+
+def _session(srv, timeout=2.0):
+    return OpenOCDSession(port=srv.port, spawn=False, timeout=timeout).start()
+
+def test_bulk_read(server):
+    srv = server()
+    ocd = _session(srv)
+    assert ocd.read_memory(BASE + 0x100, 4096) == IMAGE[0x100:0x1100]
+    assert srv.commands == [['read_memory', hex(BASE + 0x100), '32', '1024']]
+    ocd.close()
+
+def test_mdw_fallback(server):
+    srv = server(legacy=True)
+    ocd = _session(srv)
+    assert ocd.read_memory(BASE, 64) == IMAGE[:64]
+    assert ocd.read_memory(BASE + 64, 64) == IMAGE[64:128]
+    # read_memory is only tried once per session
+    assert [c[0] for c in srv.commands] == ['read_memory', 'mdw', 'mdw']
+    ocd.close()
+
+def test_failing_command_raises(server):
+    srv = server(fail_at={BASE})
+    ocd = _session(srv)
+    with pytest.raises(RuntimeError, match='failed to read memory'):
+        ocd.read_memory(BASE, 64)
+    with pytest.raises(RuntimeError, match='invalid command name'):
+        ocd.cmd('no_such_command')
+    # the session is still in step with the server afterwards
+    assert ocd.read_memory(BASE + 64, 64) == IMAGE[64:128]
+    ocd.close()
+
+def test_unaligned_region(server):
+    srv = server()
+    ocd = _session(srv)
+    fh = io.BytesIO()
+    assert ocd.read_region(fh, BASE + 3, 1001, block=256) == 1001
+    assert fh.getvalue() == IMAGE[3:1004]
+    ocd.close()
+
+def test_timeout_reconnects_and_retries(server):
+    srv = server(stall_at={BASE + 0x400})
+    ocd = _session(srv, timeout=0.3)
+    ocd.set_speed(25000)   # keeps the per-transfer timeout well under the stall
+    fh = io.BytesIO()
+    ocd.read_region(fh, BASE, 0x1000, block=0x400, retries=1)
+    assert fh.getvalue() == IMAGE[:0x1000]
+    assert srv.connections == 2
+    ocd.close()
+
+def test_firmflasher_jtag_session(server, tmp_path):
+    srv = server()
+
+    class Transport:
+        def __init__(self):
+            self.ocd = OpenOCDSession(port=srv.port, spawn=False, timeout=2.0)
+
+        def jtag_session(self):
+            return self.ocd.start()
+
+    ff = FirmFlasher(Transport(), outdir=str(tmp_path), jtag_speeds=[4000, 1000],
+                     jtag_regions=[{'name': 'flash', 'addr': BASE, 'size': len(IMAGE)}])
+    paths = ff.run_dump()
+    assert len(paths) == 1
+    assert open(paths[0], 'rb').read() == IMAGE
+    assert ff.logs == ["JTAG adapter speed 4000 kHz"]
+    ops = [c[0] for c in srv.commands]
+    assert ops[0] == 'halt' and ops[-1] == 'resume'